@@ -0,0 +1,132 @@
+import json
+import threading
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+
+def parse_fecha(value, end_of_day=False):
+    """Convierte 'YYYY-MM-DD' o una fecha ISO a segundos epoch (UTC si no trae zona)."""
+    fecha = datetime.fromisoformat(value)
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    if end_of_day and len(value) == 10:
+        fecha += timedelta(days=1) - timedelta(seconds=1)
+    return int(fecha.timestamp())
+
+
+def _bisect(positions, fechas, value):
+    # bisect_left sobre fechas[positions[i]] (bisect no acepta key en Python 3.9)
+    lo, hi = 0, len(positions)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if fechas[positions[mid]] < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class ComplaintIndex:
+    """Índice en memoria del journal de reclamos para consultas y estadísticas.
+
+    Por cada reclamo guarda solo su offset en el journal, su fecha (epoch) y su
+    posición en listas por departamento, por categoría y por ambos; los contadores
+    por categoría y departamento se actualizan al indexar cada reclamo, sin
+    recorrer el archivo. Antes de cada consulta se leen solo los bytes que el
+    journal creció desde la última vez (también los escritos por otros workers).
+    Los reclamos se anexan en orden de llegada, así que las fechas de cada lista
+    están ordenadas y un rango de fechas se resuelve con búsqueda binaria.
+    """
+
+    def __init__(self, journal):
+        self.journal = journal
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._offsets = array('q')
+        self._fechas = array('q')
+        self._all = array('l')
+        self._by_departamento = {}
+        self._by_categoria = {}
+        self._by_pair = {}
+        self._by_id = {}
+        self.counters = Counter()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def refresh(self):
+        """Indexa los reclamos anexados desde la última lectura."""
+        with self._lock:
+            start = self._offset
+            for entry, next_offset in self.journal.read(self._offset):
+                self._add(entry, start)
+                start = next_offset
+            self._offset = start
+
+    def _add(self, entry, offset):
+        position = len(self._offsets)
+        fecha = entry.get('fecha')
+        epoch = parse_fecha(fecha) if fecha else 0
+        # El reloj de dos workers puede diferir levemente: se mantiene el orden no decreciente
+        if self._fechas and epoch < self._fechas[-1]:
+            epoch = self._fechas[-1]
+        categoria, departamento = entry.get('categoria'), entry.get('departamento')
+        self._offsets.append(offset)
+        self._fechas.append(epoch)
+        self._all.append(position)
+        self._by_departamento.setdefault(departamento, array('l')).append(position)
+        self._by_categoria.setdefault(categoria, array('l')).append(position)
+        self._by_pair.setdefault((categoria, departamento), array('l')).append(position)
+        if entry.get('id'):
+            self._by_id[entry['id']] = position
+        self.counters[('total',)] += 1
+        self.counters[('categoria', categoria)] += 1
+        self.counters[('departamento', departamento)] += 1
+        self.counters[('categoria_departamento', categoria, departamento)] += 1
+
+    def _read(self, positions):
+        if not positions:
+            return []
+        entries = []
+        with open(self.journal.path, 'rb') as f:
+            for position in positions:
+                f.seek(self._offsets[position])
+                entries.append(json.loads(f.readline()))
+        return entries
+
+    def get(self, complaint_id):
+        self.refresh()
+        position = self._by_id.get(complaint_id)
+        return self._read([position])[0] if position is not None else None
+
+    def query(self, departamento=None, categoria=None, desde=None, hasta=None, page=1, page_size=50):
+        """Reclamos filtrados, del más reciente al más antiguo. ``desde``/``hasta`` en epoch."""
+        self.refresh()
+        with self._lock:
+            if departamento is not None and categoria is not None:
+                positions = self._by_pair.get((categoria, departamento), array('l'))
+            elif departamento is not None:
+                positions = self._by_departamento.get(departamento, array('l'))
+            elif categoria is not None:
+                positions = self._by_categoria.get(categoria, array('l'))
+            else:
+                positions = self._all
+            lo = _bisect(positions, self._fechas, desde) if desde is not None else 0
+            hi = _bisect(positions, self._fechas, hasta + 1) if hasta is not None else len(positions)
+            total = max(0, hi - lo)
+            end = hi - (page - 1) * page_size
+            selected = [positions[i] for i in range(end - 1, max(lo, end - page_size) - 1, -1)]
+        return {"total": total, "page": page, "page_size": page_size, "items": self._read(selected)}
+
+    def stats(self):
+        """Contadores precalculados por categoría, departamento y ambos."""
+        self.refresh()
+        with self._lock:
+            result = {"total": self.counters[('total',)], "categoria": {}, "departamento": {}, "categoria_departamento": {}}
+            for key, count in self.counters.items():
+                if key[0] in ('categoria', 'departamento'):
+                    result[key[0]][str(key[1])] = count
+                elif key[0] == 'categoria_departamento':
+                    result[key[0]][f"{key[1]}-{key[2]}"] = count
+        return result
@@ -3,8 +3,12 @@ from flask_mail import Mail, Message
 import os
 import json
 import uuid
+from datetime import datetime, timezone
 from pydantic import BaseModel, ValidationError
 from dotenv import load_dotenv
+from journal import ComplaintJournal
+from outbox import EmailOutbox
+from complaint_index import ComplaintIndex, parse_fecha
 
 load_dotenv('config.env')
 
@@ -17,8 +21,18 @@ app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 mail = Mail(app)
 
-# Ruta del archivo JSON
-DATA_FILE = 'data/reclamos.json'
+# Journal de reclamos (JSON Lines, solo anexado) y estado de la bandeja de correos
+DATA_FILE = 'data/reclamos.json'  # Formato anterior (arreglo JSON), se migra al journal
+JOURNAL_FILE = os.getenv('COMPLAINTS_JOURNAL', 'data/reclamos.jsonl')
+OUTBOX_STATE_FILE = os.getenv('COMPLAINTS_OUTBOX', 'data/outbox.jsonl')
+
+journal = ComplaintJournal(
+    JOURNAL_FILE,
+    batch_window=float(os.getenv('JOURNAL_BATCH_WINDOW', '0.005')),
+)
+
+# Índice en memoria para consultas y contadores (se pone al día leyendo solo lo nuevo del journal)
+complaint_index = ComplaintIndex(journal)
 
 # Modelo de Pydantic para validación
 class ComplaintModel(BaseModel):
@@ -35,14 +49,6 @@ def complaint():
         data = ComplaintModel(**request.json)
         complaint_id = str(uuid.uuid4())
         
-        # Leer datos existentes (si hay)
-        try:
-            with open(DATA_FILE, 'r') as f:
-                existing_data = json.load(f)
-        except FileNotFoundError:
-            existing_data = []
-
-        # Agregar nuevo reclamo
         new_entry = {
             "id": complaint_id,
             "categoria": data.categoria,
@@ -50,16 +56,12 @@ def complaint():
             "mensaje": data.mensaje,
             "nombre_denunciante": data.nombre_denunciante,
             "mail": data.mail,
-            "ip": request.remote_addr  # Capturar IP del usuario
+            "ip": request.remote_addr,  # Capturar IP del usuario
+            "fecha": datetime.now(timezone.utc).isoformat(timespec='seconds')
         }
-        existing_data.append(new_entry)
 
-        # Guardar en JSON
-        with open(DATA_FILE, 'w') as f:
-            json.dump(existing_data, f, indent=4)
-        
-        # Enviar correo
-        send_email(new_entry)
+        # Un solo anexado al journal; el correo lo envía la bandeja en segundo plano
+        journal.append(new_entry)
         
         return jsonify({"message": "Reclamo registrado", "id": complaint_id}), 200
 
@@ -68,20 +70,88 @@ def complaint():
     except Exception as e:
         return jsonify({"error": "Error interno", "detail": str(e)}), 500
 
-def send_email(complaint):
+# Consultas: /complaints?departamento=&categoria=&desde=YYYY-MM-DD&hasta=YYYY-MM-DD&page=&page_size=
+@app.route('/complaints', methods=['GET'])
+def list_complaints():
     try:
-        msg = Message(
-            f"Reclamo #{complaint['id']} recibido",
-            sender="no-reply@dominio.com",
-            recipients=[complaint['mail']]
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        result = complaint_index.query(
+            departamento=request.args.get('departamento', type=int),
+            categoria=request.args.get('categoria', type=int),
+            desde=parse_fecha(desde) if desde else None,
+            hasta=parse_fecha(hasta, end_of_day=True) if hasta else None,
+            page=max(1, request.args.get('page', default=1, type=int)),
+            page_size=min(500, max(1, request.args.get('page_size', default=50, type=int))),
         )
-        msg.body = f"""
-        Su reclamo ha sido asignado al departamento {complaint['departamento']}.
-        ID de seguimiento: {complaint['id']}
-        """
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({"error": f"Fecha inválida: {e}"}), 400
+
+@app.route('/complaints/<string:complaint_id>', methods=['GET'])
+def get_complaint(complaint_id):
+    entry = complaint_index.get(complaint_id)
+    if entry is None:
+        return jsonify({"error": "Reclamo no encontrado"}), 404
+    return jsonify(entry), 200
+
+# Contadores por categoría y departamento, mantenidos al indexar cada reclamo
+@app.route('/complaints/stats', methods=['GET'])
+def complaint_stats():
+    return jsonify(complaint_index.stats()), 200
+
+def send_email(complaint):
+    # Lanza la excepción para que la bandeja de salida reintente
+    msg = Message(
+        f"Reclamo #{complaint['id']} recibido",
+        sender="no-reply@dominio.com",
+        recipients=[complaint['mail']]
+    )
+    msg.body = f"""
+    Su reclamo ha sido asignado al departamento {complaint['departamento']}.
+    ID de seguimiento: {complaint['id']}
+    """
+    with app.app_context():
         mail.send(msg)
-    except Exception as e:
-        app.logger.error(f"Error al enviar email: {str(e)}")
+
+def migrate_legacy():
+    """Pasa los reclamos de data/reclamos.json al journal (una sola vez); ya fueron notificados."""
+    if os.path.exists(JOURNAL_FILE):
+        return
+    try:
+        with open(DATA_FILE, 'r') as f:
+            existing_data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return
+    # Se escribe un journal temporal y solo se publica después de marcar sus reclamos como
+    # notificados: si el proceso cae a mitad de camino, la migración se repite completa
+    # en el siguiente arranque y la bandeja no reenvía correos.
+    tmp_path = os.path.splitext(JOURNAL_FILE)[0] + '.migracion.jsonl'
+    directory = os.path.dirname(JOURNAL_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in existing_data:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    outbox.mark_processed(os.path.getsize(tmp_path))
+    os.replace(tmp_path, JOURNAL_FILE)
+    app.logger.info(f"{len(existing_data)} reclamos migrados de {DATA_FILE} a {JOURNAL_FILE}")
+
+outbox = EmailOutbox(
+    journal,
+    send_email,
+    OUTBOX_STATE_FILE,
+    max_retries=int(os.getenv('OUTBOX_MAX_RETRIES', '5')),
+    backoff=float(os.getenv('OUTBOX_BACKOFF', '2')),
+)
+migrate_legacy()
+
+@app.before_request
+def start_outbox():
+    # Cada worker de gunicorn lanza su hilo; solo uno obtiene el lock y envía
+    outbox.start()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=7000)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Exportación offline del journal de reclamos a columnas NumPy (.npz) para dashboards.
+
+Uso:
+    python export_columnar.py [data/reclamos.jsonl] [data/reclamos.npz]
+    python export_columnar.py --resumen data/reclamos.npz
+
+Se exportan solo las columnas que se agregan (id, fecha, categoria, departamento);
+sobre ellas un conteo por categoría/departamento o por día es un ``np.bincount`` /
+``np.unique`` que toma milisegundos aun con millones de reclamos.
+"""
+import argparse
+import json
+import os
+from array import array
+
+import numpy as np
+
+from complaint_index import parse_fecha
+from journal import ComplaintJournal
+
+
+def export(journal_path, output_path):
+    ids, fechas = [], array('q')
+    categorias, departamentos = array('h'), array('h')
+    for entry, _ in ComplaintJournal(journal_path).read():
+        ids.append(entry.get('id', ''))
+        fechas.append(parse_fecha(entry['fecha']) if entry.get('fecha') else 0)
+        categorias.append(int(entry.get('categoria') or 0))
+        departamentos.append(int(entry.get('departamento') or 0))
+    tmp_path = output_path + '.tmp.npz'
+    np.savez_compressed(
+        tmp_path,
+        id=np.array(ids, dtype='U36'),
+        fecha=np.frombuffer(fechas, dtype=np.int64).astype('datetime64[s]'),
+        categoria=np.frombuffer(categorias, dtype=np.int16),
+        departamento=np.frombuffer(departamentos, dtype=np.int16),
+    )
+    os.replace(tmp_path, output_path)
+    return len(ids)
+
+
+def summary(npz_path):
+    """Conteos por categoría, departamento, ambos y día, calculados sobre las columnas."""
+    data = np.load(npz_path)
+    categoria, departamento = data['categoria'], data['departamento']
+    pairs, pair_counts = np.unique(np.stack([categoria, departamento], axis=1), axis=0, return_counts=True)
+    days, day_counts = np.unique(data['fecha'].astype('datetime64[D]'), return_counts=True)
+    return {
+        "total": int(len(categoria)),
+        "categoria": {str(i): int(c) for i, c in enumerate(np.bincount(categoria)) if c},
+        "departamento": {str(i): int(c) for i, c in enumerate(np.bincount(departamento)) if c},
+        "categoria_departamento": {f"{p[0]}-{p[1]}": int(c) for p, c in zip(pairs, pair_counts)},
+        "por_dia": {str(d): int(c) for d, c in zip(days, day_counts)},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Exporta el journal de reclamos a columnas NumPy")
+    parser.add_argument('journal', nargs='?', default=os.getenv('COMPLAINTS_JOURNAL', 'data/reclamos.jsonl'))
+    parser.add_argument('output', nargs='?', default='data/reclamos.npz')
+    parser.add_argument('--resumen', metavar='NPZ', help="Mostrar los conteos de un archivo ya exportado")
+    args = parser.parse_args()
+
+    if args.resumen:
+        print(json.dumps(summary(args.resumen), ensure_ascii=False, indent=2))
+    else:
+        print(f"{export(args.journal, args.output)} reclamos exportados a {args.output}")
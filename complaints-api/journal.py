@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+
+class _PendingWrite:
+    __slots__ = ('data', 'done', 'error')
+
+    def __init__(self, data):
+        self.data = data
+        self.done = threading.Event()
+        self.error = None
+
+
+class ComplaintJournal:
+    """Registro de reclamos solo de anexado (JSON Lines) con fsync agrupado.
+
+    ``append`` encola la línea y espera a que un hilo escritor la persista: el
+    escritor junta las líneas que llegan durante ``batch_window`` segundos (hasta
+    ``max_batch``), las escribe con un único ``os.write`` sobre un descriptor
+    ``O_APPEND`` y hace un solo ``fsync`` por lote. Cada solicitud cuesta un anexado,
+    sin importar cuántos reclamos existan, y las escrituras de varios procesos
+    (workers de gunicorn) no se pisan.
+    """
+
+    def __init__(self, path, batch_window=0.005, max_batch=256):
+        self.path = path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # En un proceso hijo el lock pudo quedar tomado por el escritor del padre
+        self._cond = threading.Condition()
+        self._queue = []
+        self._pid = None
+        self._fd = None
+
+    def _ensure_writer(self):
+        # El hilo y el descriptor se crean por proceso: con gunicorn --preload el
+        # módulo se importa en el master y los hilos no sobreviven al fork.
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            threading.Thread(target=self._writer, name='complaint-journal', daemon=True).start()
+            self._pid = os.getpid()
+
+    def append(self, entry):
+        """Agrega un registro y retorna cuando ya está en disco (tras el fsync de su lote)."""
+        self._ensure_writer()
+        pending = _PendingWrite((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+        with self._cond:
+            self._queue.append(pending)
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.batch_window
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            try:
+                os.write(self._fd, b''.join(p.data for p in batch))
+                os.fsync(self._fd)
+            except OSError as e:
+                for p in batch:
+                    p.error = e
+            for p in batch:
+                p.done.set()
+
+    def read(self, offset=0):
+        """Itera ``(registro, offset_siguiente)`` desde ``offset`` (en bytes); ignora una línea final incompleta."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                if line.strip():
+                    yield json.loads(line), offset
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
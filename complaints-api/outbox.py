@@ -0,0 +1,117 @@
+import fcntl
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """Bandeja de salida durable para los correos de confirmación de reclamos.
+
+    El propio journal de reclamos es la cola: un hilo en segundo plano lo recorre
+    en orden desde el último offset procesado, envía el correo de cada reclamo
+    (con reintentos y backoff exponencial con jitter) y anota el resultado en
+    ``state_path`` (JSON Lines con el offset alcanzado). Tras un reinicio se retoma
+    desde ese offset, así que ningún reclamo queda sin su correo. Entre varios
+    procesos solo drena la bandeja el que obtiene el ``flock`` de ``lock_path``.
+    """
+
+    def __init__(self, journal, send, state_path, lock_path=None, max_retries=5,
+                 backoff=2.0, max_backoff=300.0, poll_interval=1.0):
+        self.journal = journal
+        self.send = send
+        self.state_path = state_path
+        self.lock_path = lock_path or state_path + '.lock'
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self._pid = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Lanza el hilo de envío en este proceso (idempotente; seguro después de un fork)."""
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name='email-outbox', daemon=True).start()
+                self._pid = os.getpid()
+        return self
+
+    def offset(self):
+        """Offset del journal hasta el que todos los reclamos ya fueron procesados."""
+        try:
+            with open(self.state_path, 'rb') as f:
+                # Basta con la última línea completa: se lee solo el final del archivo
+                start = max(0, f.seek(0, os.SEEK_END) - 4096)
+                f.seek(start)
+                lines = f.read().split(b'\n')
+        except FileNotFoundError:
+            return 0
+        if start > 0:
+            lines = lines[1:]  # la primera puede estar cortada
+        for line in reversed([line for line in lines if line.strip()]):
+            try:
+                return json.loads(line)['offset']
+            except ValueError:
+                continue
+        return 0
+
+    def _record(self, f, entry_id, status, attempts, offset):
+        f.write(json.dumps({"id": entry_id, "estado": status, "intentos": attempts, "offset": offset,
+                            "ts": time.time()}) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+    def mark_processed(self, offset):
+        """Marca como procesado todo el journal hasta ``offset`` (por ejemplo, reclamos importados ya notificados)."""
+        with open(self.state_path, 'a') as f:
+            self._record(f, None, 'importado', 0, offset)
+
+    def _run(self):
+        lock_file = open(self.lock_path, 'a')
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                time.sleep(self.poll_interval * 5)
+        logger.info(f"Bandeja de correos activa en el proceso {os.getpid()}")
+        offset = self.offset()
+        with open(self.state_path, 'a') as state:
+            while True:
+                try:
+                    processed = False
+                    for entry, next_offset in self.journal.read(offset):
+                        status, attempts = self._deliver(entry)
+                        self._record(state, entry.get('id'), status, attempts, next_offset)
+                        offset = next_offset
+                        processed = True
+                    if not processed:
+                        time.sleep(self.poll_interval)
+                except Exception as e:
+                    logger.error(f"Error en la bandeja de correos: {e}")
+                    time.sleep(self.poll_interval)
+
+    def _deliver(self, entry):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.send(entry)
+                return 'enviado', attempt
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Correo del reclamo {entry.get('id')} descartado tras {attempt} intentos: {e}")
+                    break
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+                logger.warning(f"Error al enviar el correo del reclamo {entry.get('id')} (intento {attempt}), "
+                               f"reintento en {delay:.1f}s: {e}")
+                time.sleep(delay)
+        return 'fallido', self.max_retries
@@ -0,0 +1,140 @@
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge
+
+CACHE_HITS = Counter('llm_answer_cache_hits_total', 'Respuestas del modelo servidas desde la caché', ['tipo'])
+CACHE_MISSES = Counter('llm_answer_cache_misses_total', 'Preguntas que no estaban en la caché de respuestas')
+CACHE_EVICTIONS = Counter('llm_answer_cache_evictions_total', 'Entradas expulsadas de la caché de respuestas', ['motivo'])
+CACHE_BYTES = Gauge('llm_answer_cache_bytes', 'Tamaño estimado de la caché de respuestas en bytes')
+CACHE_ENTRIES = Gauge('llm_answer_cache_entries', 'Cantidad de entradas en la caché de respuestas')
+
+_PUNTUACION = re.compile(r'[^\w\s]')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_pregunta(pregunta):
+    """Minúsculas, sin tildes ni signos de puntuación y con espacios colapsados."""
+    texto = unicodedata.normalize('NFKD', pregunta.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = _PUNTUACION.sub(' ', texto)
+    return _ESPACIOS.sub(' ', texto).strip()
+
+
+class _Entrada:
+    __slots__ = ('respuesta', 'expira', 'tamano', 'terminos', 'desconocidos')
+
+    def __init__(self, respuesta, expira, tamano, terminos, desconocidos):
+        self.respuesta = respuesta
+        self.expira = expira
+        self.tamano = tamano
+        self.terminos = terminos
+        self.desconocidos = desconocidos
+
+
+class CacheRespuestas:
+    """Caché LRU con TTL y límite en bytes para las respuestas del modelo.
+
+    La clave es la pregunta normalizada dentro de un ``espacio`` (por ejemplo,
+    respuestas directas del modelo o respuestas RAG). Con ``umbral_similitud`` > 0
+    y ``vectorizar`` (texto -> vector sparse con el vocabulario de los documentos),
+    una pregunta que no coincide exactamente puede reutilizar la respuesta de la
+    pregunta cacheada más parecida del mismo espacio: el índice de Jaccard entre
+    todas las palabras de ambas preguntas debe alcanzar el umbral y las palabras
+    que no están en el vocabulario deben ser exactamente las mismas (el vector
+    las descarta, así que "horario de la biblioteca" y "horario de la piscina"
+    no se distinguen por él). Los valores cacheados deben ser serializables a JSON.
+    """
+
+    def __init__(self, max_bytes, ttl, umbral_similitud=0.0, vectorizar=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.umbral_similitud = umbral_similitud
+        self.vectorizar = vectorizar if umbral_similitud > 0 else None
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _quitar(self, clave, motivo):
+        entrada = self._entradas.pop(clave)
+        self._bytes -= entrada.tamano
+        CACHE_EVICTIONS.labels(motivo=motivo).inc()
+
+    def _actualizar_metricas(self):
+        CACHE_BYTES.set(self._bytes)
+        CACHE_ENTRIES.set(len(self._entradas))
+
+    def _terminos(self, texto_normalizado):
+        # Palabras de la pregunta y, de ellas, las que no están en el vocabulario del índice
+        terminos = frozenset(texto_normalizado.split())
+        desconocidos = frozenset(t for t in terminos if not self.vectorizar(t).nnz)
+        return terminos, desconocidos
+
+    def _buscar_similar(self, espacio, terminos, desconocidos, ahora):
+        mejor_clave, mejor_similitud = None, self.umbral_similitud
+        for clave, entrada in self._entradas.items():
+            if (clave[0] != espacio or entrada.terminos is None or entrada.expira <= ahora
+                    or entrada.desconocidos != desconocidos):
+                continue
+            similitud = len(entrada.terminos & terminos) / len(entrada.terminos | terminos)
+            if similitud >= mejor_similitud:
+                mejor_clave, mejor_similitud = clave, similitud
+        return mejor_clave
+
+    def obtener(self, pregunta, espacio='modelo'):
+        """Devuelve la respuesta cacheada para la pregunta, o None."""
+        clave = (espacio, normalizar_pregunta(pregunta))
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada.expira <= ahora:
+                self._quitar(clave, 'ttl')
+                self._actualizar_metricas()
+                entrada = None
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                CACHE_HITS.labels(tipo='exacta').inc()
+                return entrada.respuesta
+        if self.vectorizar is not None:
+            # Se vectoriza fuera del lock; la comparación se hace sobre las entradas vigentes
+            terminos, desconocidos = self._terminos(clave[1])
+            with self._lock:
+                clave_similar = self._buscar_similar(espacio, terminos, desconocidos, ahora) if terminos else None
+                if clave_similar is not None:
+                    self._entradas.move_to_end(clave_similar)
+                    CACHE_HITS.labels(tipo='similar').inc()
+                    return self._entradas[clave_similar].respuesta
+        CACHE_MISSES.inc()
+        return None
+
+    def guardar(self, pregunta, respuesta, espacio='modelo'):
+        clave = (espacio, normalizar_pregunta(pregunta))
+        terminos, desconocidos = self._terminos(clave[1]) if self.vectorizar is not None else (None, None)
+        tamano = 2 * len(clave[1].encode('utf-8')) + len(json.dumps(respuesta, ensure_ascii=False).encode('utf-8'))
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._bytes -= self._entradas.pop(clave).tamano
+            self._entradas[clave] = _Entrada(respuesta, time.monotonic() + self.ttl, tamano, terminos, desconocidos)
+            self._bytes += tamano
+            ahora = time.monotonic()
+            # Se expulsan las entradas menos usadas recientemente (LRU) hasta respetar el límite
+            while self._bytes > self.max_bytes:
+                clave_antigua, entrada_antigua = next(iter(self._entradas.items()))
+                self._quitar(clave_antigua, 'ttl' if entrada_antigua.expira <= ahora else 'tamano')
+            self._actualizar_metricas()
+
+    def invalidar(self):
+        """Vacía la caché (por ejemplo, cuando se reprocesan los documentos). Devuelve cuántas entradas se borraron."""
+        with self._lock:
+            cantidad = len(self._entradas)
+            self._entradas.clear()
+            self._bytes = 0
+            CACHE_EVICTIONS.labels(motivo='invalidacion').inc(cantidad)
+            self._actualizar_metricas()
+        return cantidad
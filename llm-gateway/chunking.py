@@ -0,0 +1,104 @@
+import logging
+import math
+import re
+import unicodedata
+
+from nltk.tokenize import sent_tokenize
+
+logger = logging.getLogger(__name__)
+
+_ESPACIOS = re.compile(r'\s+')
+_NUMERO_PAGINA = re.compile(r'\b(?:P[aá]gina|Page)\s+\d+(?:\s+de\s+\d+)?\b', re.IGNORECASE)
+_PIEZAS = re.compile(r'\w+|[^\w\s]')
+
+
+def limpiar_texto(texto):
+    """Normaliza a NFC, quita caracteres de control y números de página, y colapsa espacios.
+
+    Conserva tildes, ñ y demás caracteres Unicode imprimibles.
+    """
+    texto = unicodedata.normalize('NFC', texto)
+    texto = ''.join(
+        c if not unicodedata.category(c).startswith('C') else ' '
+        for c in texto
+    )
+    texto = _NUMERO_PAGINA.sub(' ', texto)
+    return _ESPACIOS.sub(' ', texto).strip()
+
+
+def contar_tokens_aproximado(texto):
+    """Estimación sin modelo: palabras y signos de puntuación (subestima levemente a un tokenizador BPE)."""
+    return len(_PIEZAS.findall(texto))
+
+
+def contador_tokens_llama(model_path):
+    """Contador de tokens con el vocabulario del modelo (solo vocabulario, sin cargar pesos).
+
+    Si el modelo o ``llama_cpp`` no están disponibles se usa ``contar_tokens_aproximado``.
+    """
+    try:
+        from llama_cpp import Llama
+        tokenizador = Llama(model_path=model_path, vocab_only=True, verbose=False)
+    except Exception as e:
+        logger.warning(f"No se pudo cargar el tokenizador de {model_path} ({str(e)}); se usará una aproximación")
+        return contar_tokens_aproximado
+    return lambda texto: len(tokenizador.tokenize(texto.encode('utf-8'), add_bos=False))
+
+
+class FragmentadorTexto:
+    """Divide texto en fragmentos de hasta ``max_tokens`` tokens con ``solapamiento`` entre fragmentos consecutivos.
+
+    Las oraciones se segmentan con el modelo punkt del ``idioma`` y se cuentan una sola
+    vez; cada fragmento se arma con un único ``join`` sobre una ventana deslizante de
+    oraciones. El solapamiento se logra repitiendo al inicio del fragmento siguiente las
+    últimas oraciones del anterior que quepan en ``solapamiento`` tokens. Las oraciones
+    más largas que ``max_tokens`` se parten por palabras.
+    """
+
+    def __init__(self, contar_tokens=contar_tokens_aproximado, max_tokens=384, solapamiento=64, idioma='spanish'):
+        if not 0 <= solapamiento < max_tokens:
+            raise ValueError("solapamiento debe ser menor que max_tokens")
+        self.contar_tokens = contar_tokens
+        self.max_tokens = max_tokens
+        self.solapamiento = solapamiento
+        self.idioma = idioma
+
+    def _oraciones(self, texto):
+        """Pares (oración, tokens); las oraciones demasiado largas se dividen en partes."""
+        for oracion in sent_tokenize(texto, language=self.idioma):
+            tokens = self.contar_tokens(oracion)
+            if tokens <= self.max_tokens:
+                yield oracion, tokens
+                continue
+            palabras = oracion.split(' ')
+            partes = math.ceil(tokens / self.max_tokens) + 1
+            paso = max(1, math.ceil(len(palabras) / partes))
+            for i in range(0, len(palabras), paso):
+                parte = ' '.join(palabras[i:i + paso])
+                yield parte, self.contar_tokens(parte)
+
+    def fragmentar(self, texto):
+        fragmentos = []
+        ventana, tokens_ventana = [], 0
+        nuevas = 0  # Oraciones de la ventana que aún no salieron en ningún fragmento
+        for oracion, tokens in self._oraciones(texto):
+            if ventana and tokens_ventana + tokens > self.max_tokens:
+                if nuevas:
+                    fragmentos.append(' '.join(o for o, _ in ventana))
+                # Se conservan las últimas oraciones que quepan en el solapamiento
+                inicio, conservados = len(ventana), 0
+                while inicio > 0 and conservados + ventana[inicio - 1][1] <= self.solapamiento:
+                    inicio -= 1
+                    conservados += ventana[inicio][1]
+                ventana = ventana[inicio:]
+                tokens_ventana = conservados
+                nuevas = 0
+                # Si aun así no cabe, se sacrifica el solapamiento
+                while ventana and tokens_ventana + tokens > self.max_tokens:
+                    tokens_ventana -= ventana.pop(0)[1]
+            ventana.append((oracion, tokens))
+            tokens_ventana += tokens
+            nuevas += 1
+        if nuevas:
+            fragmentos.append(' '.join(o for o, _ in ventana))
+        return fragmentos
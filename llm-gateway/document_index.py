@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+logger = logging.getLogger(__name__)
+
+INDICE_VERSION = 2
+
+
+class _EstadoIndice:
+    """Instantánea inmutable del índice: se reemplaza completa en cada actualización."""
+
+    def __init__(self, chunks, vocabulario, conteos):
+        self.chunks = chunks              # lista de {"nombre", "mtime_ns", "tamano"}
+        self.vocabulario = vocabulario    # término -> columna
+        self.conteos = conteos            # csr (n_chunks x n_terminos) con frecuencias crudas
+        n = conteos.shape[0]
+        df = np.bincount(conteos.indices, minlength=conteos.shape[1])
+        # Misma fórmula que TfidfVectorizer(smooth_idf=True)
+        self.idf = np.log((1 + n) / (1 + df)) + 1.0
+        if n and conteos.shape[1]:
+            self.matriz = normalize(conteos.multiply(self.idf).tocsr(), norm='l2', copy=False)
+        else:
+            self.matriz = conteos
+        # Índice invertido: en CSC cada columna es la lista de postings (fragmento, peso) de un término
+        self.invertido = self.matriz.tocsc()
+
+
+class IndiceDocumentos:
+    """Índice TF-IDF persistente sobre los fragmentos de ``documents/clean``.
+
+    Guarda en disco la matriz de conteos (sparse), el vocabulario y los metadatos
+    de cada fragmento. Al actualizar solo se vuelven a leer los archivos nuevos o
+    modificados; las consultas recorren el índice invertido de los términos de la
+    pregunta y devuelven los ``k`` fragmentos mejor puntuados.
+    """
+
+    def __init__(self, documentos_dir, indice_dir):
+        self.documentos_dir = documentos_dir
+        self.indice_dir = indice_dir
+        # Sin tildes: "tramite" y "trámite" son el mismo término
+        self._analizador = TfidfVectorizer(strip_accents='unicode').build_analyzer()
+        self._lock = threading.Lock()
+        self._estado = _EstadoIndice([], {}, sparse.csr_matrix((0, 0)))
+
+    def __len__(self):
+        return len(self._estado.chunks)
+
+    # --- Persistencia ---
+    def _rutas(self):
+        return (
+            os.path.join(self.indice_dir, 'conteos.npz'),
+            os.path.join(self.indice_dir, 'vocabulario.json'),
+            os.path.join(self.indice_dir, 'chunks.json'),
+        )
+
+    def cargar(self):
+        """Carga el índice desde disco (si existe) y lo sincroniza con los fragmentos actuales."""
+        ruta_conteos, ruta_vocab, ruta_chunks = self._rutas()
+        with self._lock:
+            try:
+                with open(ruta_chunks, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                with open(ruta_vocab, 'r', encoding='utf-8') as f:
+                    vocabulario = json.load(f)
+                conteos = sparse.load_npz(ruta_conteos).tocsr()
+                if meta.get('version') != INDICE_VERSION or conteos.shape != (len(meta['chunks']), len(vocabulario)):
+                    raise ValueError("Índice en disco incompatible")
+                self._estado = _EstadoIndice(meta['chunks'], vocabulario, conteos)
+                logger.info(f"Índice de documentos cargado: {len(meta['chunks'])} fragmentos")
+            except FileNotFoundError:
+                logger.info("No existe índice de documentos en disco; se construirá uno nuevo")
+            except Exception as e:
+                logger.warning(f"No se pudo cargar el índice de documentos ({str(e)}); se reconstruirá")
+        return self.actualizar()
+
+    def _guardar(self, estado):
+        os.makedirs(self.indice_dir, exist_ok=True)
+        ruta_conteos, ruta_vocab, ruta_chunks = self._rutas()
+        # Escritura atómica: archivo temporal + os.replace. chunks.json se escribe al final.
+        tmp = f'{ruta_conteos}.{os.getpid()}.tmp.npz'
+        sparse.save_npz(tmp, estado.conteos)
+        os.replace(tmp, ruta_conteos)
+        for ruta, contenido in (
+            (ruta_vocab, estado.vocabulario),
+            (ruta_chunks, {"version": INDICE_VERSION, "chunks": estado.chunks}),
+        ):
+            tmp = f'{ruta}.{os.getpid()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(contenido, f, ensure_ascii=False)
+            os.replace(tmp, ruta)
+
+    # --- Actualización incremental ---
+    def _escanear(self):
+        actuales = {}
+        if not os.path.isdir(self.documentos_dir):
+            return actuales
+        with os.scandir(self.documentos_dir) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and entrada.name.endswith('.txt'):
+                    st = entrada.stat()
+                    actuales[entrada.name] = {"nombre": entrada.name, "mtime_ns": st.st_mtime_ns, "tamano": st.st_size}
+        return actuales
+
+    def actualizar(self):
+        """Sincroniza el índice con los fragmentos en disco. Devuelve True si hubo cambios."""
+        with self._lock:
+            anterior = self._estado
+            actuales = self._escanear()
+            conservar = []
+            for fila, chunk in enumerate(anterior.chunks):
+                actual = actuales.get(chunk['nombre'])
+                if actual and actual['mtime_ns'] == chunk['mtime_ns'] and actual['tamano'] == chunk['tamano']:
+                    conservar.append(fila)
+            conservados = {anterior.chunks[fila]['nombre'] for fila in conservar}
+            nuevos = sorted(nombre for nombre in actuales if nombre not in conservados)
+            eliminados = len(anterior.chunks) - len(conservar)
+            if not nuevos and not eliminados:
+                return False
+
+            vocabulario = dict(anterior.vocabulario)
+            filas, columnas, valores = [], [], []
+            for i, nombre in enumerate(nuevos):
+                with open(os.path.join(self.documentos_dir, nombre), 'r', encoding='utf-8') as f:
+                    frecuencias = Counter(self._analizador(f.read()))
+                for termino, cantidad in frecuencias.items():
+                    columna = vocabulario.setdefault(termino, len(vocabulario))
+                    filas.append(i)
+                    columnas.append(columna)
+                    valores.append(cantidad)
+
+            n_terminos = len(vocabulario)
+            base = anterior.conteos[conservar] if conservar else sparse.csr_matrix((0, anterior.conteos.shape[1]))
+            base = sparse.csr_matrix((base.data, base.indices, base.indptr), shape=(base.shape[0], n_terminos))
+            agregados = sparse.csr_matrix(
+                (np.array(valores, dtype=np.float64), (filas, columnas)), shape=(len(nuevos), n_terminos)
+            )
+            conteos = sparse.vstack([base, agregados], format='csr')
+            chunks = [anterior.chunks[fila] for fila in conservar] + [actuales[nombre] for nombre in nuevos]
+
+            estado = _EstadoIndice(chunks, vocabulario, conteos)
+            self._guardar(estado)
+            self._estado = estado
+            logger.info(
+                f"Índice de documentos actualizado: {len(nuevos)} fragmentos nuevos/modificados, "
+                f"{eliminados} eliminados o reemplazados, {len(chunks)} en total"
+            )
+            return True
+
+    # --- Consulta ---
+    def _terminos_consulta(self, texto, estado):
+        """Columnas y pesos TF-IDF (normalizados L2) de los términos conocidos del texto."""
+        frecuencias = Counter(t for t in self._analizador(texto) if t in estado.vocabulario)
+        columnas = np.fromiter((estado.vocabulario[t] for t in frecuencias), dtype=np.int64, count=len(frecuencias))
+        pesos = np.fromiter(frecuencias.values(), dtype=np.float64, count=len(frecuencias)) * estado.idf[columnas]
+        norma = np.linalg.norm(pesos)
+        return columnas, (pesos / norma if norma else pesos)
+
+    def vectorizar(self, texto, estado=None):
+        """Vector TF-IDF normalizado (1 x n_terminos) de un texto con el vocabulario del índice."""
+        estado = estado or self._estado
+        columnas, pesos = self._terminos_consulta(texto, estado)
+        return sparse.csr_matrix(
+            (pesos, (np.zeros(len(columnas), dtype=np.int64), columnas)),
+            shape=(1, len(estado.vocabulario)),
+        )
+
+    def buscar(self, pregunta, k=3, umbral=0.2):
+        """Devuelve hasta ``k`` pares (nombre, similitud) con similitud coseno mayor que ``umbral``.
+
+        Solo se recorren las listas de postings de los términos de la pregunta, por lo
+        que el costo depende de cuántos fragmentos contienen esos términos y no del
+        tamaño total del corpus.
+        """
+        estado = self._estado
+        if not estado.chunks or k <= 0:
+            return []
+        columnas, pesos = self._terminos_consulta(pregunta, estado)
+        if not len(columnas):
+            return []
+        indptr, indices, datos = estado.invertido.indptr, estado.invertido.indices, estado.invertido.data
+        filas = np.concatenate([indices[indptr[c]:indptr[c + 1]] for c in columnas])
+        aportes = np.concatenate([datos[indptr[c]:indptr[c + 1]] * w for c, w in zip(columnas, pesos)])
+        if not len(filas):
+            return []
+        candidatos, posicion = np.unique(filas, return_inverse=True)
+        puntajes = np.bincount(posicion, weights=aportes)
+        if len(puntajes) > k:
+            mejores = np.argpartition(-puntajes, k - 1)[:k]
+        else:
+            mejores = np.arange(len(puntajes))
+        mejores = mejores[np.argsort(-puntajes[mejores], kind='stable')]
+        return [
+            (estado.chunks[candidatos[i]]['nombre'], float(puntajes[i]))
+            for i in mejores
+            if puntajes[i] > umbral
+        ]
+
+    def mejor_coincidencia(self, pregunta, umbral=0.2):
+        """Devuelve (nombre, similitud) del fragmento más parecido, o (None, 0.0) bajo el umbral."""
+        resultados = self.buscar(pregunta, k=1, umbral=umbral)
+        return resultados[0] if resultados else (None, 0.0)
+
+    def leer_chunk(self, nombre):
+        with open(os.path.join(self.documentos_dir, nombre), 'r', encoding='utf-8') as f:
+            return f.read()
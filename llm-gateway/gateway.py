@@ -1,3 +1,6 @@
+import time
+INICIO_IMPORTACION = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,19 +9,20 @@ from starlette.responses import JSONResponse
 from pydantic import BaseModel
 import requests
 import os
-import nltk
-from sklearn.feature_extraction.text import TfidfVectorizer
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, Histogram
+from fastapi.responses import Response, StreamingResponse
 import traceback
 import logging
+import threading
 from logging.handlers import RotatingFileHandler
-from typing import List
-import glob
+from typing import List, Optional
 from llama_cpp import Llama
-
-nltk.download('punkt')
+from document_index import IndiceDocumentos
+from answer_cache import CacheRespuestas
+from inference import PlanificadorInferencia, ColaLlenaError, ModeloNoDisponibleError
+from rag import ConstructorPromptRAG
+from resources import GestorRecursos, RecursosError
 
 app = FastAPI()
 
@@ -47,8 +51,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Recursos locales (sin descargas en el arranque) y tiempos de cada fase
+gestor_recursos = GestorRecursos()
+gestor_recursos.registrar_fase("importacion", time.perf_counter() - INICIO_IMPORTACION)
+
 class QuestionRequest(BaseModel):
     question: str
+    k: Optional[int] = None  # Cantidad de pasajes a recuperar (por defecto RETRIEVAL_TOP_K)
+    umbral: Optional[float] = None  # Similitud mínima (por defecto RETRIEVAL_THRESHOLD)
+    modo: Optional[str] = None  # "documento" o "rag" (por defecto RESPONSE_MODE)
 
 # Middleware para restringir IPs
 class IPWhitelistMiddleware(BaseHTTPMiddleware):
@@ -75,7 +86,9 @@ def list_endpoints():
     return {
         "endpoints": [
             {"path": "/process", "method": "POST", "desc": "Procesa una pregunta y responde usando contexto municipal."},
+            {"path": "/process/stream", "method": "POST", "desc": "Igual que /process, pero transmite la respuesta del modelo token a token (SSE)."},
             {"path": "/rasa-action", "method": "POST", "desc": "Recibe acciones personalizadas desde Rasa y responde según lógica definida."},
+            {"path": "/cache/invalidate", "method": "POST", "desc": "Vacía la caché de respuestas del modelo."},
             {"path": "/endpoints", "method": "GET", "desc": "Lista los endpoints disponibles."},
             {"path": "/health", "method": "GET", "desc": "Verifica el estado básico del servicio."},
             {"path": "/metrics", "method": "GET", "desc": "Expone métricas Prometheus para monitoreo."}
@@ -94,78 +107,327 @@ def metrics():
 
 # --- Configuración del modelo Llama-3-8B-Q4_K_M ---
 LLAMA_MODEL_PATH = os.path.join(os.path.dirname(__file__), 'llm-models', 'meta-llama-3-8b-instruct.Q4_K_M.gguf')
-llama_model = None
+LLM_REPLICAS = int(os.getenv("LLM_REPLICAS", "1"))  # Instancias del modelo atendiendo en paralelo
+LLM_THREADS = int(os.getenv("LLM_THREADS", "4"))  # Hilos de llama.cpp por réplica
+LLM_N_CTX = 2048
+LLM_MAX_TOKENS = 256
+# Prefijo fijo de todos los prompts: su estado KV se calcula una vez por réplica y se reutiliza
+PROMPT_SISTEMA = os.getenv(
+    "LLM_SYSTEM_PROMPT",
+    "Eres el asistente virtual de la municipalidad. Respondes en español a consultas de los vecinos "
+    "sobre trámites, ordenanzas y servicios municipales. Si no conoces la respuesta, indícalo y sugiere "
+    "acudir a la oficina correspondiente.\n\n",
+)
 
 def load_llama_model():
-    global llama_model
-    if llama_model is None:
-        llama_model = Llama(model_path=LLAMA_MODEL_PATH, n_ctx=2048, n_threads=4)
-    return llama_model
+    """Crea una instancia nueva del modelo; cada réplica del planificador tiene la suya."""
+    return Llama(model_path=LLAMA_MODEL_PATH, n_ctx=LLM_N_CTX, n_threads=LLM_THREADS)
+
+# --- Planificador de inferencia: cola acotada, réplicas y micro-lotes ---
+planificador = PlanificadorInferencia(
+    load_llama_model,
+    replicas=LLM_REPLICAS,
+    tam_cola=int(os.getenv("LLM_QUEUE_SIZE", "16")),
+    tam_lote=int(os.getenv("LLM_BATCH_SIZE", "4")),
+    retry_after=int(os.getenv("LLM_RETRY_AFTER_SECONDS", "5")),
+    timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "120")),
+    prefijo=PROMPT_SISTEMA,
+)
+
+@app.on_event("startup")
+def cargar_recursos():
+    with gestor_recursos.fase("recursos"):
+        try:
+            gestor_recursos.cargar_manifest()
+        except RecursosError as e:
+            # Sin artefacto (p. ej. en desarrollo) el índice se construye desde los documentos
+            logger.warning(str(e))
+
+@app.on_event("startup")
+def iniciar_planificador():
+    # Las réplicas cargan y precalientan el modelo en segundo plano; /health informa cuándo están listas
+    planificador.iniciar()
+
+@app.get("/health")
+def health():
+    estado = {
+        "replicas_listas": planificador.replicas_listas,
+        "replicas": planificador.replicas,
+        "fragmentos_indexados": len(indice_documentos),
+        "fases_arranque": gestor_recursos.fases,
+    }
+    # Con al menos una réplica lista el servicio atiende ("degradado" si faltan réplicas)
+    if not planificador.listo:
+        return JSONResponse(status_code=503, content={"estado": planificador.estado, **estado})
+    return {"estado": planificador.estado, **estado}
+
+def respuesta_saturado(e: ColaLlenaError):
+    logger.warning("Cola de inferencia llena: solicitud rechazada")
+    return HTTPException(
+        status_code=503,
+        detail="El servicio está saturado, intenta nuevamente en unos segundos",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+def respuesta_no_disponible():
+    logger.warning("Ninguna réplica del modelo Llama está disponible: solicitud rechazada")
+    return HTTPException(
+        status_code=503,
+        detail="El modelo no está disponible en este momento, intenta nuevamente más tarde",
+        headers={"Retry-After": str(planificador.espera_carga)},
+    )
+
+# --- Índice persistente de documentos txt ---
+DOCUMENTOS_DIR = os.path.join(os.path.dirname(__file__), 'documents', 'clean')
+INDICE_DIR = os.getenv("INDEX_PATH", gestor_recursos.indice_dir)
+INDEX_REFRESH_SECONDS = int(os.getenv("INDEX_REFRESH_SECONDS", "60"))
+indice_documentos = IndiceDocumentos(DOCUMENTOS_DIR, INDICE_DIR)
+
+def refrescar_indice_periodicamente():
+    evento = threading.Event()
+    while not evento.wait(INDEX_REFRESH_SECONDS):
+        try:
+            if indice_documentos.actualizar():
+                # Los documentos cambiaron: las respuestas cacheadas pueden haber quedado obsoletas
+                cache_respuestas.invalidar()
+        except Exception as e:
+            logger.error(f"Error al actualizar el índice de documentos: {str(e)}\n{traceback.format_exc()}")
+
+@app.on_event("startup")
+def cargar_indice_documentos():
+    with gestor_recursos.fase("indice"):
+        indice_documentos.cargar()
+    if INDEX_REFRESH_SECONDS > 0:
+        threading.Thread(target=refrescar_indice_periodicamente, name="refresco-indice", daemon=True).start()
+    gestor_recursos.registrar_fase("arranque_total", time.perf_counter() - INICIO_IMPORTACION)
 
 # --- Utilidad para buscar en documentos txt ---
-def buscar_en_documentos(pregunta, documentos_dir=None):
-    if documentos_dir is None:
-        documentos_dir = os.path.join(os.path.dirname(__file__), 'documents', 'clean')
-    archivos = glob.glob(os.path.join(documentos_dir, '*.txt'))
-    corpus = []
-    nombres = []
-    for archivo in archivos:
-        with open(archivo, 'r', encoding='utf-8') as f:
-            corpus.append(f.read())
-            nombres.append(os.path.basename(archivo))
-    if not corpus:
-        return None, None
-    vectorizer = TfidfVectorizer().fit(corpus + [pregunta])
-    pregunta_vec = vectorizer.transform([pregunta])
-    corpus_vec = vectorizer.transform(corpus)
-    similitudes = cosine_similarity(pregunta_vec, corpus_vec)[0]
-    idx_max = similitudes.argmax()
-    if similitudes[idx_max] > 0.2:  # Umbral configurable
-        return corpus[idx_max], nombres[idx_max]
-    return None, None
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+RETRIEVAL_THRESHOLD = float(os.getenv("RETRIEVAL_THRESHOLD", "0.2"))
+
+def buscar_en_documentos(pregunta, k=None, umbral=None, indice=None):
+    """Devuelve los pasajes más relevantes como [{"fuente", "puntaje", "texto"}], de mayor a menor puntaje."""
+    indice = indice or indice_documentos
+    k = RETRIEVAL_TOP_K if k is None else k
+    umbral = RETRIEVAL_THRESHOLD if umbral is None else umbral
+    pasajes = []
+    for doc_name, puntaje in indice.buscar(pregunta, k=k, umbral=umbral):
+        try:
+            texto = indice.leer_chunk(doc_name)
+        except OSError:
+            # El fragmento se eliminó después de la última actualización del índice
+            logger.warning(f"Fragmento indexado no disponible: {doc_name}")
+            continue
+        pasajes.append({"fuente": doc_name, "puntaje": round(puntaje, 4), "texto": texto})
+    return pasajes
+
+# --- Caché de respuestas del modelo ---
+cache_respuestas = CacheRespuestas(
+    max_bytes=int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl=int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+    umbral_similitud=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0")),  # > 0 activa la búsqueda de preguntas similares (Jaccard)
+    vectorizar=indice_documentos.vectorizar,
+)
+
+# Métricas de generación
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    'llm_time_to_first_token_seconds', 'Tiempo hasta el primer token generado por Llama',
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32),
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    'llm_tokens_per_second', 'Velocidad de decodificación de Llama en tokens por segundo',
+    buckets=(1, 2, 4, 6, 8, 12, 16, 24, 32, 64),
+)
+
+# --- Modo RAG: pasajes recuperados dentro del prompt con presupuesto de tokens ---
+RESPONSE_MODE = os.getenv("RESPONSE_MODE", "documento")  # "documento": pasaje textual; "rag": respuesta del modelo con contexto
+MODOS_RESPUESTA = ("documento", "rag")
+tokenizador_llama = None
+tokenizador_lock = threading.Lock()
+
+def cargar_tokenizador():
+    """Instancia del modelo solo con vocabulario (sin pesos) para medir prompts en tokens."""
+    global tokenizador_llama
+    with tokenizador_lock:
+        if tokenizador_llama is None:
+            tokenizador_llama = Llama(model_path=LLAMA_MODEL_PATH, vocab_only=True, verbose=False)
+    return tokenizador_llama
+
+constructor_rag = ConstructorPromptRAG(
+    tokenizar=lambda texto: cargar_tokenizador().tokenize(texto, add_bos=False),
+    destokenizar=lambda tokens: cargar_tokenizador().detokenize(tokens),
+    n_ctx=LLM_N_CTX,
+    max_tokens_respuesta=LLM_MAX_TOKENS,
+    presupuesto_contexto=int(os.getenv("RAG_CONTEXT_TOKENS", "1024")),
+)
+
+def resolver_modo(req: QuestionRequest):
+    modo = req.modo or RESPONSE_MODE
+    if modo not in MODOS_RESPUESTA:
+        raise HTTPException(status_code=400, detail=f"Modo no válido: {modo}. Opciones: {', '.join(MODOS_RESPUESTA)}")
+    return modo
+
+def preparar_prompt(pregunta, pasajes=None):
+    """Devuelve (prompt, fuentes). Con pasajes arma el prompt RAG; sin ellos, el prompt directo."""
+    if pasajes:
+        return constructor_rag.construir(PROMPT_SISTEMA, pregunta, pasajes)
+    return f"{PROMPT_SISTEMA}Pregunta: {pregunta}\nResponde de forma clara y concisa.", []
+
+def generar_tokens_llama(prompt):
+    """Encola el prompt en el planificador y devuelve un iterador del texto generado token a token.
+
+    Lanza ColaLlenaError de inmediato si la cola está llena. El iterador registra
+    TTFT (incluida la espera en cola) y tokens/s.
+    """
+    solicitud = planificador.enviar(prompt, max_tokens=LLM_MAX_TOKENS, stop=["\n"])
+
+    def tokens():
+        primer_token = None
+        cantidad = 0
+        for texto in solicitud:
+            cantidad += 1
+            if primer_token is None:
+                primer_token = time.perf_counter()
+                LLM_TIME_TO_FIRST_TOKEN.observe(primer_token - solicitud.encolada)
+            yield texto
+        if cantidad > 1:
+            # La velocidad se mide sin el prefill (desde el primer token)
+            LLM_TOKENS_PER_SECOND.observe((cantidad - 1) / max(time.perf_counter() - primer_token, 1e-6))
+
+    return tokens()
+
+def espacio_cache(pasajes):
+    # En modo RAG la respuesta depende de los pasajes recuperados (y por lo tanto de k/umbral):
+    # se cachea por pregunta y conjunto ordenado de fragmentos usados como contexto
+    if not pasajes:
+        return "modelo"
+    return "rag:" + "|".join(p["fuente"] for p in pasajes)
+
+def consultar_llama(pregunta, pasajes=None):
+    """Respuesta del modelo usando la caché. Devuelve ({"respuesta", "fuentes"}, desde_cache)."""
+    resultado = cache_respuestas.obtener(pregunta, espacio_cache(pasajes))
+    if resultado is not None:
+        return resultado, True
+    prompt, fuentes = preparar_prompt(pregunta, pasajes)
+    resultado = {"respuesta": "".join(generar_tokens_llama(prompt)).strip(), "fuentes": fuentes}
+    cache_respuestas.guardar(pregunta, resultado, espacio_cache(pasajes))
+    return resultado, False
+
+def respuesta_modelo(resultado, desde_cache):
+    return {
+        "respuesta": resultado["respuesta"],
+        "fuente": "llama-3-8b",
+        "tipo": "rag" if resultado["fuentes"] else "modelo",
+        "fuentes": resultado["fuentes"],
+        "cache": desde_cache,
+    }
+
+@app.post("/cache/invalidate", tags=["mantenimiento"])
+def invalidate_cache(credentials: HTTPBasicCredentials = Depends(authenticate)):
+    borradas = cache_respuestas.invalidar()
+    logger.info(f"Caché de respuestas invalidada: {borradas} entradas")
+    return {"invalidadas": borradas}
 
 # --- Endpoint principal para preguntas ---
 @app.post("/process", tags=["consulta"])
 def process_question(req: QuestionRequest, credentials: HTTPBasicCredentials = Depends(authenticate)):
     pregunta = req.question.strip()
+    modo = resolver_modo(req)
     # 1. Buscar primero en documentos
-    contexto, doc_name = buscar_en_documentos(pregunta)
-    if contexto:
-        logger.info(f"Respuesta encontrada en documento: {doc_name}")
-        return {"respuesta": contexto, "fuente": doc_name, "tipo": "documento"}
-    # 2. Si no hay respuesta relevante, consultar el modelo Llama
+    pasajes = buscar_en_documentos(pregunta, k=req.k, umbral=req.umbral)
+    if pasajes and modo == "documento":
+        logger.info(f"Respuesta encontrada en documento: {pasajes[0]['fuente']} (puntaje {pasajes[0]['puntaje']})")
+        return {"respuesta": pasajes[0]["texto"], "fuente": pasajes[0]["fuente"], "tipo": "documento", "pasajes": pasajes}
+    # 2. Consultar el modelo Llama (con los pasajes como contexto en modo RAG)
     try:
-        model = load_llama_model()
-        prompt = f"Pregunta: {pregunta}\nResponde de forma clara y concisa."
-        output = model(prompt, max_tokens=256, stop=["\n"])
-        respuesta = output["choices"][0]["text"].strip()
-        logger.info("Respuesta generada por Llama-3-8B-Q4_K_M")
-        return {"respuesta": respuesta, "fuente": "llama-3-8b", "tipo": "modelo"}
+        resultado, desde_cache = consultar_llama(pregunta, pasajes)
+        logger.info("Respuesta " + ("obtenida de la caché" if desde_cache else "generada por Llama-3-8B-Q4_K_M") + f" (fuentes: {resultado['fuentes']})")
+        return respuesta_modelo(resultado, desde_cache)
+    except ColaLlenaError as e:
+        raise respuesta_saturado(e)
+    except ModeloNoDisponibleError:
+        raise respuesta_no_disponible()
     except Exception as e:
         logger.error(f"Error al consultar el modelo Llama: {str(e)}")
         raise HTTPException(status_code=500, detail="Error al consultar el modelo Llama")
 
+# --- Endpoint de preguntas con respuesta transmitida (Server-Sent Events) ---
+def evento_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+def respuesta_sse(eventos):
+    return StreamingResponse(
+        eventos,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/process/stream", tags=["consulta"])
+def process_question_stream(req: QuestionRequest, credentials: HTTPBasicCredentials = Depends(authenticate)):
+    pregunta = req.question.strip()
+    modo = resolver_modo(req)
+    # 1. Documentos y caché responden de inmediato en un solo evento
+    pasajes = buscar_en_documentos(pregunta, k=req.k, umbral=req.umbral)
+    if pasajes and modo == "documento":
+        logger.info(f"Stream: respuesta encontrada en documento: {pasajes[0]['fuente']}")
+        return respuesta_sse(iter([evento_sse("fin", {"respuesta": pasajes[0]["texto"], "fuente": pasajes[0]["fuente"], "tipo": "documento", "pasajes": pasajes})]))
+    resultado = cache_respuestas.obtener(pregunta, espacio_cache(pasajes))
+    if resultado is not None:
+        logger.info("Stream: respuesta obtenida de la caché")
+        return respuesta_sse(iter([evento_sse("fin", respuesta_modelo(resultado, True))]))
+    # 2. El modelo Llama se transmite token a token; si la cola está llena se rechaza antes de abrir el stream
+    try:
+        prompt, fuentes = preparar_prompt(pregunta, pasajes)
+        tokens = generar_tokens_llama(prompt)
+    except ColaLlenaError as e:
+        raise respuesta_saturado(e)
+    except ModeloNoDisponibleError:
+        raise respuesta_no_disponible()
+    except Exception as e:
+        logger.error(f"Error al consultar el modelo Llama: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error al consultar el modelo Llama")
+
+    def eventos():
+        yield evento_sse("inicio", {"fuente": "llama-3-8b", "tipo": "rag" if fuentes else "modelo", "fuentes": fuentes})
+        partes = []
+        try:
+            for texto in tokens:
+                partes.append(texto)
+                yield evento_sse("token", {"texto": texto})
+        except Exception as e:
+            logger.error(f"Error al transmitir respuesta del modelo Llama: {str(e)}")
+            yield evento_sse("error", {"detail": "Error al consultar el modelo Llama"})
+            return
+        resultado = {"respuesta": "".join(partes).strip(), "fuentes": fuentes}
+        cache_respuestas.guardar(pregunta, resultado, espacio_cache(pasajes))
+        logger.info("Stream: respuesta generada por Llama-3-8B-Q4_K_M")
+        yield evento_sse("fin", respuesta_modelo(resultado, False))
+
+    return respuesta_sse(eventos())
+
 # --- Endpoint para fallback de Rasa ---
 @app.post("/rasa-action", tags=["rasa"])
 def rasa_fallback(req: QuestionRequest, credentials: HTTPBasicCredentials = Depends(authenticate)):
     pregunta = req.question.strip()
+    modo = resolver_modo(req)
     # Evitar recurrencia: solo permitir un fallback por pregunta
     if hasattr(req, 'fallback_done') and req.fallback_done:
         logger.warning("Recurrencia de fallback detectada. Respondiendo con mensaje de control.")
         return {"respuesta": "No se pudo encontrar una respuesta adecuada. Por favor, reformula tu pregunta.", "tipo": "control"}
     # Buscar primero en documentos
-    contexto, doc_name = buscar_en_documentos(pregunta)
-    if contexto:
-        logger.info(f"Fallback: respuesta encontrada en documento: {doc_name}")
-        return {"respuesta": contexto, "fuente": doc_name, "tipo": "documento"}
+    pasajes = buscar_en_documentos(pregunta, k=req.k, umbral=req.umbral)
+    if pasajes and modo == "documento":
+        logger.info(f"Fallback: respuesta encontrada en documento: {pasajes[0]['fuente']} (puntaje {pasajes[0]['puntaje']})")
+        return {"respuesta": pasajes[0]["texto"], "fuente": pasajes[0]["fuente"], "tipo": "documento", "pasajes": pasajes}
     # Consultar modelo Llama
     try:
-        model = load_llama_model()
-        prompt = f"Pregunta: {pregunta}\nResponde de forma clara y concisa."
-        output = model(prompt, max_tokens=256, stop=["\n"])
-        respuesta = output["choices"][0]["text"].strip()
-        logger.info("Fallback: respuesta generada por Llama-3-8B-Q4_K_M")
-        return {"respuesta": respuesta, "fuente": "llama-3-8b", "tipo": "modelo"}
+        resultado, desde_cache = consultar_llama(pregunta, pasajes)
+        logger.info("Fallback: respuesta " + ("obtenida de la caché" if desde_cache else "generada por Llama-3-8B-Q4_K_M") + f" (fuentes: {resultado['fuentes']})")
+        return respuesta_modelo(resultado, desde_cache)
+    except ColaLlenaError as e:
+        raise respuesta_saturado(e)
+    except ModeloNoDisponibleError:
+        raise respuesta_no_disponible()
     except Exception as e:
         logger.error(f"Error en fallback de Rasa: {str(e)}")
         raise HTTPException(status_code=500, detail="Error en fallback de Rasa")
@@ -0,0 +1,266 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_QUEUE_DEPTH = Gauge('llm_inference_queue_depth', 'Solicitudes en espera en la cola de inferencia')
+INFERENCE_REJECTED = Counter('llm_inference_rejected_total', 'Solicitudes rechazadas por cola de inferencia llena')
+INFERENCE_QUEUE_WAIT = Histogram(
+    'llm_inference_queue_wait_seconds', 'Tiempo de espera en cola antes de iniciar la generación',
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    'llm_inference_batch_size', 'Solicitudes atendidas por cada micro-lote',
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16),
+)
+INFERENCE_COALESCED = Counter(
+    'llm_inference_coalesced_total', 'Solicitudes atendidas con la generación de otra solicitud idéntica del mismo lote'
+)
+INFERENCE_REPLICAS_READY = Gauge('llm_inference_replicas_ready', 'Réplicas del modelo cargadas y atendiendo la cola')
+
+_FIN = object()
+
+
+class ColaLlenaError(Exception):
+    """La cola de inferencia está llena; el cliente debe reintentar después de ``retry_after`` segundos."""
+
+    def __init__(self, retry_after):
+        super().__init__("Cola de inferencia llena")
+        self.retry_after = retry_after
+
+
+class ModeloNoDisponibleError(Exception):
+    """Ninguna réplica pudo cargar el modelo (se siguen reintentando en segundo plano)."""
+
+    def __init__(self):
+        super().__init__("Modelo Llama no disponible")
+
+
+class SolicitudInferencia:
+    """Solicitud encolada. Se itera para recibir el texto generado a medida que llega."""
+
+    def __init__(self, prompt, max_tokens, stop, timeout):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.stop = tuple(stop or ())
+        self.timeout = timeout
+        self.encolada = time.perf_counter()
+        self.cancelada = False
+        self._salida = queue.Queue()
+
+    @property
+    def clave(self):
+        return (self.prompt, self.max_tokens, self.stop)
+
+    def _publicar(self, elemento):
+        self._salida.put(elemento)
+
+    def cancelar(self):
+        self.cancelada = True
+
+    def __iter__(self):
+        try:
+            while True:
+                try:
+                    elemento = self._salida.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError("Tiempo de espera agotado para la respuesta del modelo")
+                if elemento is _FIN:
+                    return
+                if isinstance(elemento, Exception):
+                    raise elemento
+                yield elemento
+        finally:
+            # Si el consumidor abandona (cliente desconectado, error), la réplica puede dejar de generar
+            self.cancelar()
+
+
+class PlanificadorInferencia:
+    """Cola acotada de inferencia atendida por ``replicas`` instancias independientes del modelo.
+
+    Cada réplica es un hilo con su propia instancia de ``Llama`` (llama.cpp libera el
+    GIL durante la evaluación). Al iniciar, cada réplica carga el modelo, evalúa el
+    ``prefijo`` común de los prompts, guarda ese estado KV y hace una generación de
+    prueba; recién entonces cuenta como lista. Antes de cada generación se restaura
+    el estado del prefijo si la réplica lo perdió, de modo que solo se evalúa la
+    parte variable del prompt.
+
+    Cada réplica toma la solicitud más antigua de la cola y, junto con ella, hasta
+    ``tam_lote - 1`` solicitudes encoladas con el mismo prompt, que se generan una
+    sola vez; los prompts distintos quedan en la cola para las demás réplicas. Si la
+    cola está llena, ``enviar`` falla de inmediato con ``ColaLlenaError``.
+
+    Una réplica cuyo modelo no carga no toma solicitudes: reintenta la carga en
+    segundo plano con espera exponencial (``espera_carga`` hasta
+    ``espera_carga_max`` segundos). Mientras quede al menos una réplica lista el
+    servicio atiende (``estado`` "degradado" si faltan réplicas); si todas fallaron,
+    ``enviar`` rechaza las solicitudes con ``ModeloNoDisponibleError``.
+    """
+
+    def __init__(self, crear_modelo, replicas=1, tam_cola=16, tam_lote=4, retry_after=5, timeout=120, prefijo="",
+                 espera_carga=5, espera_carga_max=300):
+        self.crear_modelo = crear_modelo
+        self.replicas = replicas
+        self.tam_lote = max(1, tam_lote)
+        self.tam_cola = tam_cola
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self.prefijo = prefijo
+        self.espera_carga = espera_carga
+        self.espera_carga_max = espera_carga_max
+        self._pendientes = deque()
+        self._cond = threading.Condition()
+        self._hilos = []
+        self._replicas_listas = 0
+        self._replicas_caidas = 0
+
+    @property
+    def replicas_listas(self):
+        return self._replicas_listas
+
+    @property
+    def listo(self):
+        """Hay al menos una réplica atendiendo la cola."""
+        return self._replicas_listas > 0
+
+    @property
+    def estado(self):
+        """"ok", "degradado" (faltan réplicas), "iniciando" o "no_disponible" (todas fallaron al cargar)."""
+        if self._replicas_listas >= self.replicas:
+            return "ok"
+        if self._replicas_listas > 0:
+            return "degradado"
+        return "no_disponible" if self._replicas_caidas >= self.replicas else "iniciando"
+
+    def iniciar(self):
+        """Lanza las réplicas; cada una carga y precalienta su modelo en segundo plano."""
+        if self._hilos:
+            return
+        for numero in range(self.replicas):
+            hilo = threading.Thread(target=self._atender, args=(numero,), name=f"replica-llama-{numero}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def enviar(self, prompt, max_tokens=256, stop=None):
+        """Encola un prompt y devuelve la ``SolicitudInferencia`` asociada (iterable de texto)."""
+        solicitud = SolicitudInferencia(prompt, max_tokens, stop, self.timeout)
+        with self._cond:
+            if self.estado == "no_disponible":
+                raise ModeloNoDisponibleError()
+            if len(self._pendientes) >= self.tam_cola:
+                INFERENCE_REJECTED.inc()
+                raise ColaLlenaError(self.retry_after)
+            self._pendientes.append(solicitud)
+            INFERENCE_QUEUE_DEPTH.set(len(self._pendientes))
+            self._cond.notify()
+        return solicitud
+
+    def _tomar_lote(self):
+        """La solicitud más antigua y las encoladas con su mismo prompt (hasta ``tam_lote``)."""
+        with self._cond:
+            while not self._pendientes:
+                self._cond.wait()
+            primera = self._pendientes.popleft()
+            lote = [primera]
+            if self.tam_lote > 1:
+                restantes = deque()
+                for solicitud in self._pendientes:
+                    if len(lote) < self.tam_lote and solicitud.clave == primera.clave:
+                        lote.append(solicitud)
+                    else:
+                        restantes.append(solicitud)
+                self._pendientes = restantes
+            INFERENCE_QUEUE_DEPTH.set(len(self._pendientes))
+        return lote
+
+    def _preparar_replica(self, numero):
+        """Carga y precalienta una réplica. Devuelve (modelo, estado_prefijo) o (None, None) si falla."""
+        inicio = time.perf_counter()
+        try:
+            modelo = self.crear_modelo()
+            estado_prefijo = None
+            if self.prefijo:
+                tokens = modelo.tokenize(self.prefijo.encode('utf-8'))
+                modelo.reset()
+                modelo.eval(tokens)
+                estado_prefijo = (tokens, modelo.save_state())
+            # Generación de prueba: fuerza la carga real de los pesos y la inicialización de buffers
+            for _ in modelo(self.prefijo + "Hola", max_tokens=1, stream=True):
+                pass
+        except Exception as e:
+            logger.error(f"Réplica {numero}: error al cargar el modelo Llama: {str(e)}")
+            return None, None
+        logger.info(f"Réplica {numero} del modelo Llama lista en {time.perf_counter() - inicio:.1f}s")
+        return modelo, estado_prefijo
+
+    def _cargar_con_reintentos(self, numero):
+        # Sin modelo la réplica no toma solicitudes: las atienden las réplicas que sí cargaron
+        espera = self.espera_carga
+        caida = False
+        while True:
+            modelo, estado_prefijo = self._preparar_replica(numero)
+            if modelo is not None:
+                with self._cond:
+                    self._replicas_listas += 1
+                    if caida:
+                        self._replicas_caidas -= 1
+                    INFERENCE_REPLICAS_READY.set(self._replicas_listas)
+                return modelo, estado_prefijo
+            if not caida:
+                caida = True
+                with self._cond:
+                    self._replicas_caidas += 1
+                    if self.estado == "no_disponible":
+                        # Ninguna réplica puede atender: las solicitudes en espera fallan de inmediato
+                        error = ModeloNoDisponibleError()
+                        for solicitud in self._pendientes:
+                            solicitud._publicar(error)
+                        self._pendientes.clear()
+                        INFERENCE_QUEUE_DEPTH.set(0)
+            logger.warning(f"Réplica {numero}: nuevo intento de carga en {espera:.0f}s")
+            time.sleep(espera)
+            espera = min(espera * 2, self.espera_carga_max)
+
+    def _atender(self, numero):
+        modelo, estado_prefijo = self._cargar_con_reintentos(numero)
+        while True:
+            lote = self._tomar_lote()
+            INFERENCE_BATCH_SIZE.observe(len(lote))
+            # El lote solo contiene solicitudes con el mismo prompt: se genera una sola vez
+            INFERENCE_COALESCED.inc(len(lote) - 1)
+            self._generar(modelo, lote, estado_prefijo)
+
+    def _restaurar_prefijo(self, modelo, estado_prefijo):
+        tokens, estado = estado_prefijo
+        if modelo.n_tokens < len(tokens) or modelo.input_ids[:len(tokens)].tolist() != tokens:
+            modelo.load_state(estado)
+
+    def _generar(self, modelo, solicitudes, estado_prefijo=None):
+        ahora = time.perf_counter()
+        for solicitud in solicitudes:
+            INFERENCE_QUEUE_WAIT.observe(ahora - solicitud.encolada)
+        activas = [s for s in solicitudes if not s.cancelada]
+        if not activas:
+            return
+        base = activas[0]
+        try:
+            if estado_prefijo is not None and base.prompt.startswith(self.prefijo):
+                # llama.cpp reutiliza el KV de los tokens iniciales que coinciden con los ya evaluados
+                self._restaurar_prefijo(modelo, estado_prefijo)
+            for parte in modelo(base.prompt, max_tokens=base.max_tokens, stop=list(base.stop), stream=True):
+                texto = parte["choices"][0]["text"]
+                for solicitud in activas:
+                    solicitud._publicar(texto)
+                if all(s.cancelada for s in activas):
+                    break
+            for solicitud in activas:
+                solicitud._publicar(_FIN)
+        except Exception as e:
+            logger.error(f"Error durante la generación con Llama: {str(e)}")
+            for solicitud in activas:
+                solicitud._publicar(e)
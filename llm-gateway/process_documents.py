@@ -1,62 +1,190 @@
+import argparse
+import glob
+import hashlib
+import json
 import os
 import re
-import shutil
-import nltk
-nltk.download('punkt')
-from nltk.tokenize import sent_tokenize
-
-def clean_text(text):
-    # Eliminar múltiples espacios en blanco y saltos de línea innecesarios
-    text = re.sub(r'\s+', ' ', text)
-    # Eliminar caracteres no imprimibles
-    text = re.sub(r'[^\x20-\x7E]+', '', text)
-    # Eliminar encabezados y pies de página comunes
-    text = re.sub(r'Page \d+', '', text)
-    # Eliminar líneas vacías
-    text = re.sub(r'\n\s*\n+', '\n', text)
-    return text.strip()
-
-def split_text_into_chunks(text, max_chunk_size=2048):
-    sentences = sent_tokenize(text)
-    chunks = []
-    current_chunk = ""
-    for sentence in sentences:
-        # Si agregar la oración supera el límite, inicia un nuevo chunk
-        if len(current_chunk) + len(sentence) + 1 > max_chunk_size:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence
-        else:
-            current_chunk += " " + sentence
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    return chunks
-
-def process_files(input_dir, output_dir):
-    # Limpiar la carpeta de fragmentos antes de procesar
-    if os.path.exists(output_dir):
-        shutil.rmtree(output_dir)
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+
+from chunking import FragmentadorTexto, contador_tokens_llama, limpiar_texto
+from document_index import IndiceDocumentos
+from resources import GestorRecursos
+
+EXTENSIONES = ('.txt', '.pdf')
+MANIFEST_VERSION = 2
+LLAMA_MODEL_PATH = os.getenv(
+    "LLAMA_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'llm-models', 'meta-llama-3-8b-instruct.Q4_K_M.gguf'),
+)
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "384"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+CHUNK_LANGUAGE = os.getenv("CHUNK_LANGUAGE", "spanish")
+
+# Fragmentador de cada proceso del pool (se crea una vez por proceso en iniciar_worker)
+_fragmentador = None
+
+def iniciar_worker(config):
+    global _fragmentador
+    # Modelos punkt desde el artefacto local de recursos (sin descargas)
+    GestorRecursos().configurar_nltk((config['idioma'],))
+    _fragmentador = FragmentadorTexto(
+        contador_tokens_llama(config['modelo']),
+        max_tokens=config['max_tokens'],
+        solapamiento=config['solapamiento'],
+        idioma=config['idioma'],
+    )
+
+# --- Extracción ---
+def hash_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def hash_texto(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+def extraer_texto(ruta):
+    if ruta.lower().endswith('.pdf'):
+        lector = PdfReader(ruta)
+        return "\n".join(pagina.extract_text() or "" for pagina in lector.pages)
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def nombre_chunk(base, i):
+    return f"{base}_part{i + 1}.txt"
+
+def listar_fuentes(input_dir):
+    """Archivos a ingerir por nombre base. Si existen X.txt y X.pdf se usa el .txt (texto ya extraído)."""
+    fuentes = {}
+    for filename in sorted(os.listdir(input_dir)):
+        base, ext = os.path.splitext(filename)
+        if ext.lower() not in EXTENSIONES or not os.path.isfile(os.path.join(input_dir, filename)):
+            continue
+        if base in fuentes and ext.lower() == '.pdf':
+            continue
+        fuentes[base] = filename
+    return fuentes
+
+# --- Procesamiento de un documento (se ejecuta en el pool de procesos) ---
+def procesar_documento(input_path, output_dir, base, anterior):
+    """Procesa un documento si su contenido cambió. Escribe solo los fragmentos nuevos o distintos.
+
+    Devuelve la nueva entrada del manifiesto y la cantidad de fragmentos escritos.
+    """
+    sha = hash_archivo(input_path)
+    if anterior and anterior.get('sha256') == sha:
+        return anterior, 0
+    chunks = _fragmentador.fragmentar(limpiar_texto(extraer_texto(input_path)))
+    hashes_anteriores = (anterior or {}).get('chunks', [])
+    hashes = []
+    escritos = 0
+    for i, chunk in enumerate(chunks):
+        h = hash_texto(chunk)
+        hashes.append(h)
+        chunk_path = os.path.join(output_dir, nombre_chunk(base, i))
+        if i < len(hashes_anteriores) and hashes_anteriores[i] == h and os.path.exists(chunk_path):
+            continue
+        tmp = chunk_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as chunk_file:
+            chunk_file.write(chunk)
+        os.replace(tmp, chunk_path)
+        escritos += 1
+    return {"archivo": os.path.basename(input_path), "sha256": sha, "chunks": hashes}, escritos
+
+def eliminar_chunks(output_dir, base, desde):
+    """Borra los fragmentos ``base_partN.txt`` con N > desde (restos de una versión más larga)."""
+    patron = re.compile(re.escape(base) + r'_part(\d+)\.txt$')
+    for ruta in glob.glob(os.path.join(glob.escape(output_dir), glob.escape(base) + '_part*.txt')):
+        coincidencia = patron.match(os.path.basename(ruta))
+        if coincidencia and int(coincidencia.group(1)) > desde:
+            os.remove(ruta)
+
+# --- Manifiesto ---
+def cargar_manifest(ruta, config):
+    """Manifiesto previo; si cambió la configuración de fragmentación se descarta y se reprocesa todo."""
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION and manifest.get('config') == config:
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {"version": MANIFEST_VERSION, "config": config, "documentos": {}}
+
+def guardar_manifest(ruta, manifest):
+    tmp = ruta + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, ruta)
+
+def process_files(input_dir, output_dir, manifest_path=None, index_dir=None, workers=None, forzar=False,
+                  max_tokens=CHUNK_MAX_TOKENS, solapamiento=CHUNK_OVERLAP_TOKENS, idioma=CHUNK_LANGUAGE,
+                  modelo=LLAMA_MODEL_PATH):
+    """Ingesta incremental: solo reprocesa documentos cuyo hash cambió y luego actualiza el índice."""
+    inicio = time.perf_counter()
     os.makedirs(output_dir, exist_ok=True)
+    manifest_path = manifest_path or os.path.join(input_dir, 'manifest.json')
+    config = {"max_tokens": max_tokens, "solapamiento": solapamiento, "idioma": idioma,
+              "modelo": os.path.basename(modelo)}
+    manifest = {"version": MANIFEST_VERSION, "config": config, "documentos": {}} if forzar else cargar_manifest(manifest_path, config)
+    anteriores = manifest['documentos']
+    fuentes = listar_fuentes(input_dir)
+
+    # Documentos que ya no existen: se borran sus fragmentos
+    for base in set(anteriores) - set(fuentes):
+        eliminar_chunks(output_dir, base, 0)
+        del anteriores[base]
+        print(f"Eliminado {base}: ya no está en {input_dir}/")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_worker, initargs=(dict(config, modelo=modelo),)) as pool:
+        futuros = {
+            base: pool.submit(procesar_documento, os.path.join(input_dir, filename), output_dir, base, anteriores.get(base))
+            for base, filename in fuentes.items()
+        }
+        for base, futuro in futuros.items():
+            try:
+                entrada, escritos = futuro.result()
+            except Exception as e:
+                print(f"Error al procesar {fuentes[base]}: {str(e)}")
+                continue
+            if entrada == anteriores.get(base):
+                continue
+            eliminar_chunks(output_dir, base, len(entrada['chunks']))
+            anteriores[base] = entrada
+            print(f"Procesado {fuentes[base]}: {len(entrada['chunks'])} fragmentos, {escritos} escritos en {output_dir}/")
+
+    guardar_manifest(manifest_path, manifest)
+    print(f"Ingesta completada en {time.perf_counter() - inicio:.1f}s")
 
-    for filename in os.listdir(input_dir):
-        if filename.endswith('.txt'):
-            input_path = os.path.join(input_dir, filename)
-            with open(input_path, 'r', encoding='utf-8') as file:
-                raw_text = file.read()
-                cleaned_text = clean_text(raw_text)
-                chunks = split_text_into_chunks(cleaned_text)
-            
-            # Guardar cada fragmento en la carpeta clean
-            for i, chunk in enumerate(chunks):
-                chunk_filename = f"{os.path.splitext(filename)[0]}_part{i+1}.txt"
-                chunk_path = os.path.join(output_dir, chunk_filename)
-                with open(chunk_path, 'w', encoding='utf-8') as chunk_file:
-                    chunk_file.write(chunk)
-            
-            print(f"Procesado {filename} y guardado {len(chunks)} fragmentos en {output_dir}/")
+    if index_dir:
+        # Actualización incremental del índice: solo se re-tokenizan los fragmentos modificados
+        IndiceDocumentos(output_dir, index_dir).cargar()
 
 if __name__ == "__main__":
-    base_dir = os.path.dirname(__file__)
-    input_dir = os.path.join(base_dir, 'documents')
-    output_dir = os.path.join(base_dir, 'documents', 'clean')
-    process_files(input_dir, output_dir)
\ No newline at end of file
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Ingesta incremental de documentos para llm-gateway")
+    parser.add_argument('--input', default=os.path.join(base_dir, 'documents'))
+    parser.add_argument('--output', default=os.path.join(base_dir, 'documents', 'clean'))
+    parser.add_argument('--index', default=os.getenv("INDEX_PATH", GestorRecursos().indice_dir))
+    parser.add_argument('--max-tokens', type=int, default=CHUNK_MAX_TOKENS, help="Tamaño máximo de cada fragmento en tokens del modelo")
+    parser.add_argument('--solapamiento', type=int, default=CHUNK_OVERLAP_TOKENS, help="Tokens repetidos entre fragmentos consecutivos")
+    parser.add_argument('--idioma', default=CHUNK_LANGUAGE, help="Modelo punkt para segmentar oraciones")
+    parser.add_argument('--modelo', default=LLAMA_MODEL_PATH, help="Modelo GGUF cuyo tokenizador mide los fragmentos")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos en paralelo (por defecto, uno por CPU)")
+    parser.add_argument('--forzar', action='store_true', help="Ignora el manifiesto y reprocesa todo")
+    parser.add_argument('--sin-indice', action='store_true', help="No actualizar el índice de búsqueda")
+    args = parser.parse_args()
+    process_files(
+        args.input, args.output,
+        index_dir=None if args.sin_indice else args.index,
+        workers=args.workers,
+        forzar=args.forzar,
+        max_tokens=args.max_tokens,
+        solapamiento=args.solapamiento,
+        idioma=args.idioma,
+        modelo=args.modelo,
+    )
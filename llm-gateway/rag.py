@@ -0,0 +1,56 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de este espacio libre no vale la pena incluir un pasaje truncado
+MIN_TOKENS_PASAJE = 48
+
+
+class ConstructorPromptRAG:
+    """Arma prompts RAG empaquetando pasajes recuperados dentro de un presupuesto de tokens.
+
+    Los tokens se miden con el tokenizador del modelo (``tokenizar``: bytes -> lista de
+    tokens, ``destokenizar``: tokens -> bytes). El presupuesto efectivo nunca supera lo
+    que queda de ``n_ctx`` tras el prefijo, la pregunta y los ``max_tokens`` de respuesta.
+    """
+
+    def __init__(self, tokenizar, destokenizar, n_ctx=2048, max_tokens_respuesta=256, presupuesto_contexto=1024):
+        self.tokenizar = tokenizar
+        self.destokenizar = destokenizar
+        self.n_ctx = n_ctx
+        self.max_tokens_respuesta = max_tokens_respuesta
+        self.presupuesto_contexto = presupuesto_contexto
+
+    def _contar(self, texto):
+        return len(self.tokenizar(texto.encode('utf-8')))
+
+    def _truncar(self, texto, max_tokens):
+        tokens = self.tokenizar(texto.encode('utf-8'))[:max_tokens]
+        return self.destokenizar(tokens).decode('utf-8', errors='ignore').strip() + " ..."
+
+    def construir(self, prefijo, pregunta, pasajes):
+        """Devuelve (prompt, fuentes) con los pasajes que caben, en orden de relevancia."""
+        cola = (
+            f"Pregunta: {pregunta}\n"
+            "Responde de forma clara y concisa usando solo el contexto anterior "
+            "e indica entre corchetes la fuente utilizada."
+        )
+        fijo = self._contar(prefijo + "Contexto:\n" + cola)
+        disponible = min(self.presupuesto_contexto, self.n_ctx - self.max_tokens_respuesta - fijo)
+        bloques, fuentes = [], []
+        for pasaje in pasajes:
+            if disponible < MIN_TOKENS_PASAJE:
+                break
+            bloque = f"[{pasaje['fuente']}]\n{pasaje['texto'].strip()}\n\n"
+            costo = self._contar(bloque)
+            if costo > disponible:
+                encabezado = f"[{pasaje['fuente']}]\n"
+                bloque = encabezado + self._truncar(pasaje['texto'], disponible - self._contar(encabezado) - 4) + "\n\n"
+                costo = self._contar(bloque)
+                if costo > disponible:
+                    break
+            bloques.append(bloque)
+            fuentes.append(pasaje['fuente'])
+            disponible -= costo
+        logger.debug(f"Prompt RAG con {len(fuentes)} pasajes; quedan {disponible} tokens de contexto libres")
+        return f"{prefijo}Contexto:\n{''.join(bloques)}{cola}", fuentes
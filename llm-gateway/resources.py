@@ -0,0 +1,116 @@
+import argparse
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+RECURSOS_VERSION = 1
+RECURSOS_DIR = os.getenv("RESOURCES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources'))
+PAQUETES_NLTK = ('punkt',)
+
+STARTUP_PHASE_SECONDS = Gauge('llm_gateway_startup_phase_seconds', 'Duración de cada fase de importación y arranque', ['fase'])
+
+
+class RecursosError(Exception):
+    """El artefacto de recursos falta o no corresponde a esta versión del código."""
+
+
+class GestorRecursos:
+    """Artefacto local versionado con los modelos punkt de NLTK y el índice de documentos.
+
+    Se construye al crear la imagen (``python resources.py``); en cada arranque solo se
+    valida y se lee desde disco, sin descargas. También registra la duración de cada
+    fase de importación y arranque (logs y métrica ``llm_gateway_startup_phase_seconds``).
+    """
+
+    def __init__(self, directorio=RECURSOS_DIR):
+        self.directorio = directorio
+        self.manifest = None
+        self.fases = {}
+
+    @property
+    def nltk_dir(self):
+        return os.path.join(self.directorio, 'nltk_data')
+
+    @property
+    def indice_dir(self):
+        return os.path.join(self.directorio, 'index')
+
+    def registrar_fase(self, nombre, segundos):
+        self.fases[nombre] = round(segundos, 4)
+        STARTUP_PHASE_SECONDS.labels(fase=nombre).set(segundos)
+        logger.info(f"Fase de arranque '{nombre}': {segundos * 1000:.0f} ms")
+
+    @contextmanager
+    def fase(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_fase(nombre, time.perf_counter() - inicio)
+
+    def cargar_manifest(self):
+        ruta = os.path.join(self.directorio, 'manifest.json')
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            raise RecursosError(f"No hay artefacto de recursos válido en {self.directorio} ({str(e)}); ejecuta 'python resources.py'")
+        if manifest.get('version') != RECURSOS_VERSION:
+            raise RecursosError(
+                f"Artefacto de recursos versión {manifest.get('version')}, se esperaba {RECURSOS_VERSION}; ejecuta 'python resources.py'"
+            )
+        self.manifest = manifest
+        return manifest
+
+    def configurar_nltk(self, idiomas=('spanish',)):
+        """Usa únicamente los datos NLTK del artefacto y precarga los modelos punkt indicados."""
+        import nltk
+        if self.nltk_dir not in nltk.data.path:
+            nltk.data.path.insert(0, self.nltk_dir)
+        for idioma in idiomas:
+            try:
+                nltk.data.load(f'tokenizers/punkt/{idioma}.pickle')
+            except LookupError:
+                raise RecursosError(f"Falta el modelo punkt '{idioma}' en {self.nltk_dir}; ejecuta 'python resources.py'")
+
+
+def construir(directorio=RECURSOS_DIR, documentos_dir=None):
+    """Descarga los datos NLTK y construye el índice de documentos dentro de ``directorio``."""
+    import nltk
+    from document_index import IndiceDocumentos
+
+    gestor = GestorRecursos(directorio)
+    os.makedirs(gestor.nltk_dir, exist_ok=True)
+    for paquete in PAQUETES_NLTK:
+        if not nltk.download(paquete, download_dir=gestor.nltk_dir, quiet=True, raise_on_error=True):
+            raise RecursosError(f"No se pudo descargar el paquete NLTK '{paquete}'")
+    if documentos_dir:
+        indice = IndiceDocumentos(documentos_dir, gestor.indice_dir)
+        indice.cargar()
+        logger.info(f"Índice de documentos construido con {len(indice)} fragmentos")
+    manifest = {
+        "version": RECURSOS_VERSION,
+        "creado": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "nltk": nltk.__version__,
+        "paquetes_nltk": list(PAQUETES_NLTK),
+    }
+    tmp = os.path.join(directorio, f'manifest.json.{os.getpid()}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(directorio, 'manifest.json'))
+    return manifest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Construye el artefacto de recursos del llm-gateway")
+    parser.add_argument('--destino', default=RECURSOS_DIR)
+    parser.add_argument('--documentos', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'documents', 'clean'))
+    args = parser.parse_args()
+    print(json.dumps(construir(args.destino, args.documentos), ensure_ascii=False, indent=2))
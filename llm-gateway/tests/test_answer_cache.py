@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from answer_cache import CacheRespuestas
+from document_index import IndiceDocumentos
+
+
+def _indice(tmp_path):
+    documentos = tmp_path / 'clean'
+    documentos.mkdir()
+    (documentos / 'horarios.txt').write_text(
+        "El horario de atención municipal es de lunes a viernes de 8:30 a 14:00 horas.", encoding='utf-8')
+    indice = IndiceDocumentos(str(documentos), str(tmp_path / 'indice'))
+    indice.cargar()
+    return indice
+
+
+def test_umbral_cero_solo_coincidencia_exacta(tmp_path):
+    cache = CacheRespuestas(max_bytes=1 << 20, ttl=60, vectorizar=_indice(tmp_path).vectorizar)
+    cache.guardar("¿Cuál es el horario de la biblioteca municipal?", {"respuesta": "biblioteca"})
+    assert cache.obtener("cual es el horario de la biblioteca municipal") == {"respuesta": "biblioteca"}
+    assert cache.obtener("¿Cuál es el horario de la biblioteca?") is None
+
+
+def test_similares_no_confunden_sustantivos_fuera_del_vocabulario(tmp_path):
+    cache = CacheRespuestas(max_bytes=1 << 20, ttl=60, umbral_similitud=0.5, vectorizar=_indice(tmp_path).vectorizar)
+    cache.guardar("¿Cuál es el horario de la biblioteca municipal?", {"respuesta": "biblioteca"})
+    assert cache.obtener("¿Cuál es el horario de la piscina municipal?") is None
+    assert cache.obtener("¿Y cuál es el horario de la biblioteca municipal?") is None  # "y" no está en el vocabulario
+    assert cache.obtener("¿Cuál es el horario de atención de la biblioteca municipal?") == {"respuesta": "biblioteca"}
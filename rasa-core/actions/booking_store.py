@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Text
+
+logger = logging.getLogger(__name__)
+
+DISPONIBLE = "available"
+PENDIENTE = "pending"
+CONFIRMADO = "confirmed"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS horarios (
+    cod_fun TEXT NOT NULL,
+    nom_func TEXT NOT NULL,
+    orden INTEGER NOT NULL,
+    hora TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    usuario TEXT,
+    email_usuario TEXT,
+    descripcion_consulta TEXT,
+    actualizado REAL,
+    PRIMARY KEY (cod_fun, hora)
+);
+CREATE INDEX IF NOT EXISTS idx_horarios_estado ON horarios (estado, orden, hora);
+CREATE INDEX IF NOT EXISTS idx_horarios_hora ON horarios (hora, estado, orden);
+"""
+
+
+class AgendaCitas:
+    """Agenda de citas en SQLite (modo WAL) con transiciones por horario tipo compare-and-set.
+
+    Cada horario es una fila (funcionario, hora). Las transiciones
+    ``available -> pending -> confirmed`` (y ``pending -> available`` al liberar) se
+    aplican con un ``UPDATE ... WHERE estado = <esperado>`` dentro de una transacción
+    inmediata, por lo que dos conversaciones (o dos procesos del servidor de acciones)
+    nunca reservan el mismo horario y cada reserva escribe solo su fila. Las consultas
+    de horarios disponibles usan los índices por estado/funcionario y por hora.
+    """
+
+    def __init__(self, ruta_db: Text, ruta_json: Optional[Text] = None):
+        self.ruta_db = ruta_db
+        self.ruta_json = ruta_json
+        self._local = threading.local()
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta_db, timeout=10, isolation_level=None)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    @contextmanager
+    def _transaccion(self):
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexion
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        conexion.execute("COMMIT")
+
+    def inicializar(self) -> "AgendaCitas":
+        """Crea el esquema y, si la agenda está vacía, importa los horarios de ``ruta_json``."""
+        directorio = os.path.dirname(self.ruta_db)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._conexion().executescript(_ESQUEMA)
+        with self._transaccion() as conexion:
+            vacia = conexion.execute("SELECT 1 FROM horarios LIMIT 1").fetchone() is None
+            if vacia and self.ruta_json and os.path.exists(self.ruta_json):
+                cantidad = self._importar(conexion, self.ruta_json)
+                logger.info(f"Agenda de citas inicializada con {cantidad} horarios desde {self.ruta_json}")
+        return self
+
+    def _importar(self, conexion: sqlite3.Connection, ruta_json: Text) -> int:
+        with open(ruta_json, 'r', encoding='utf-8-sig') as f:
+            datos = json.load(f)
+        filas = [
+            (func["cod_fun"], func["nom_func"], orden, hora, slot.get("estado", DISPONIBLE),
+             slot.get("usuario"), slot.get("email_usuario"), slot.get("descripcion_consulta"), time.time())
+            for orden, func in enumerate(datos.get("funcionarios", []))
+            for hora, slot in func.get("horarios", {}).items()
+        ]
+        conexion.executemany("INSERT OR IGNORE INTO horarios VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", filas)
+        return len(filas)
+
+    # --- Consultas ---
+    def disponibles(self, cod_fun: Optional[Text] = None) -> List[Dict[Text, Any]]:
+        """Horarios disponibles (de un funcionario o de todos), por funcionario y hora."""
+        consulta = "SELECT cod_fun, nom_func, hora FROM horarios WHERE estado = ?"
+        parametros = [DISPONIBLE]
+        if cod_fun:
+            consulta += " AND cod_fun = ?"
+            parametros.append(cod_fun)
+        filas = self._conexion().execute(consulta + " ORDER BY orden, hora", parametros).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def disponibles_por_hora(self, limite: Optional[int] = None) -> List[Dict[Text, Any]]:
+        """Una opción por hora con algún horario libre (el primer funcionario en el orden de la agenda)."""
+        consulta = (
+            "SELECT cod_fun, nom_func, hora, MIN(orden) AS orden FROM horarios WHERE estado = ? "
+            "GROUP BY hora ORDER BY hora"
+        )
+        parametros: List[Any] = [DISPONIBLE]
+        if limite:
+            consulta += " LIMIT ?"
+            parametros.append(limite)
+        filas = self._conexion().execute(consulta, parametros).fetchall()
+        return [{"cod_fun": f["cod_fun"], "nom_func": f["nom_func"], "hora": f["hora"]} for f in filas]
+
+    def primer_funcionario_disponible(self) -> Optional[Dict[Text, Any]]:
+        fila = self._conexion().execute(
+            "SELECT cod_fun, nom_func FROM horarios WHERE estado = ? ORDER BY orden, hora LIMIT 1", (DISPONIBLE,)
+        ).fetchone()
+        return dict(fila) if fila else None
+
+    def horario(self, cod_fun: Text, hora: Text) -> Optional[Dict[Text, Any]]:
+        fila = self._conexion().execute(
+            "SELECT * FROM horarios WHERE cod_fun = ? AND hora = ?", (cod_fun, hora)
+        ).fetchone()
+        return dict(fila) if fila else None
+
+    # --- Transiciones ---
+    def reservar(self, hora: Text, usuario: Optional[Text], email_usuario: Optional[Text],
+                 descripcion_consulta: Optional[Text], cod_fun: Optional[Text] = None) -> Optional[Dict[Text, Any]]:
+        """Pasa a ``pending`` el primer horario disponible a esa hora. Devuelve el horario o None si no hay."""
+        consulta = "SELECT cod_fun, nom_func FROM horarios WHERE hora = ? AND estado = ?"
+        parametros = [hora, DISPONIBLE]
+        if cod_fun:
+            consulta += " AND cod_fun = ?"
+            parametros.append(cod_fun)
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            fila = conexion.execute(consulta + " ORDER BY orden LIMIT 1", parametros).fetchone()
+            if fila is None:
+                return None
+            conexion.execute(
+                "UPDATE horarios SET estado = ?, usuario = ?, email_usuario = ?, descripcion_consulta = ?, actualizado = ? "
+                "WHERE cod_fun = ? AND hora = ? AND estado = ?",
+                (PENDIENTE, usuario, email_usuario, descripcion_consulta, ahora, fila["cod_fun"], hora, DISPONIBLE),
+            )
+        return {"cod_fun": fila["cod_fun"], "nom_func": fila["nom_func"], "hora": hora, "actualizado": ahora}
+
+    def _transicion(self, cod_fun: Text, hora: Text, desde: Text, hacia: Text, limpiar: bool = False) -> bool:
+        asignaciones = "estado = ?, actualizado = ?"
+        if limpiar:
+            asignaciones += ", usuario = NULL, email_usuario = NULL, descripcion_consulta = NULL"
+        with self._transaccion() as conexion:
+            cursor = conexion.execute(
+                f"UPDATE horarios SET {asignaciones} WHERE cod_fun = ? AND hora = ? AND estado = ?",
+                (hacia, time.time(), cod_fun, hora, desde),
+            )
+        return cursor.rowcount == 1
+
+    def confirmar(self, cod_fun: Text, hora: Text) -> bool:
+        """``pending -> confirmed``. Devuelve False si el horario ya no estaba pendiente."""
+        return self._transicion(cod_fun, hora, PENDIENTE, CONFIRMADO)
+
+    def liberar(self, cod_fun: Text, hora: Text) -> bool:
+        """``pending -> available`` (reserva abandonada o cancelada)."""
+        return self._transicion(cod_fun, hora, PENDIENTE, DISPONIBLE, limpiar=True)
+
+    def expirar(self, cod_fun: Text, hora: Text, actualizado: float) -> bool:
+        """Libera una reserva vencida solo si sigue pendiente y es la misma (``actualizado`` no cambió)."""
+        with self._transaccion() as conexion:
+            cursor = conexion.execute(
+                "UPDATE horarios SET estado = ?, usuario = NULL, email_usuario = NULL, descripcion_consulta = NULL, actualizado = ? "
+                "WHERE cod_fun = ? AND hora = ? AND estado = ? AND actualizado = ?",
+                (DISPONIBLE, time.time(), cod_fun, hora, PENDIENTE, actualizado),
+            )
+        return cursor.rowcount == 1
+
+    def pendientes(self) -> List[Dict[Text, Any]]:
+        filas = self._conexion().execute(
+            "SELECT cod_fun, hora, actualizado FROM horarios WHERE estado = ?", (PENDIENTE,)
+        ).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def contar(self, estado: Text) -> int:
+        return self._conexion().execute("SELECT COUNT(*) FROM horarios WHERE estado = ?", (estado,)).fetchone()[0]
+
+    def pendiente_de(self, hora: Text, email_usuario: Optional[Text]) -> Optional[Dict[Text, Any]]:
+        """Horario pendiente a esa hora reservado por ``email_usuario``."""
+        fila = self._conexion().execute(
+            "SELECT cod_fun, nom_func, hora FROM horarios WHERE hora = ? AND estado = ? AND email_usuario IS ? ORDER BY orden LIMIT 1",
+            (hora, PENDIENTE, email_usuario),
+        ).fetchone()
+        return dict(fila) if fila else None
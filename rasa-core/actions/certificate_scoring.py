@@ -0,0 +1,150 @@
+import argparse
+import json
+import logging
+import re
+from collections import Counter
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Text
+
+if __package__:
+    from .document_catalog import CatalogoDocumentos
+else:
+    # Ejecutado como script (evaluación offline): sin importar el paquete, que arranca el servidor de acciones
+    from document_catalog import CatalogoDocumentos
+
+logger = logging.getLogger(__name__)
+
+PESOS_POR_DEFECTO = {"accion": 1, "combinacion": 2, "token_prioritario": 0}
+
+
+class MotorPuntajeCertificados:
+    """Puntúa los certificados del catálogo según los tokens ``accion_cert`` de una consulta.
+
+    Se construye una vez con la tabla ``files/json/prioridades_certificados.json``:
+    índices token -> certificados (acciones del catálogo y tokens prioritarios) y
+    combinación de tokens -> certificados. El puntaje de cada candidato es
+
+        pesos.accion * acciones coincidentes
+        + pesos.combinacion * combinaciones completas presentes en la consulta
+        + pesos.token_prioritario * tokens prioritarios coincidentes
+
+    y se calcula con intersecciones de conjuntos y búsquedas de las combinaciones
+    de la consulta (tokens sueltos, pares y tríos) en el índice, sin recorrer las
+    listas de cada certificado. Una combinación se cumple cuando todos sus tokens
+    están en la consulta, así que los repetidos cuentan una vez
+    (``["recolectar", "recolectar"]`` equivale a ``["recolectar"]``).
+    """
+
+    def __init__(self, tabla: Any, catalogo: CatalogoDocumentos):
+        self.catalogo = catalogo
+        tabla = tabla if isinstance(tabla, dict) else {}
+        self.pesos = {**PESOS_POR_DEFECTO, **tabla.get("pesos", {})}
+
+        self._prioritarios: Dict[Text, Dict[Text, None]] = {}
+        for id_documento, tokens in tabla.get("tokens_prioritarios", {}).items():
+            if self._validar(id_documento):
+                for token in tokens:
+                    self._prioritarios.setdefault(token.lower(), {})[id_documento] = None
+
+        self._combinaciones: Dict[frozenset, List[Text]] = {}
+        self.max_combinacion = 0
+        for id_documento, combos in tabla.get("combinaciones", {}).items():
+            if not self._validar(id_documento):
+                continue
+            for combo in combos:
+                clave = frozenset(elemento.lower() for elemento in combo)
+                certificados = self._combinaciones.setdefault(clave, [])
+                if id_documento not in certificados:
+                    certificados.append(id_documento)
+                self.max_combinacion = max(self.max_combinacion, len(clave))
+
+    def _validar(self, id_documento: Text) -> bool:
+        if self.catalogo.por_id(id_documento) is None:
+            logger.warning(f"Prioridades para un certificado inexistente en el catálogo: {id_documento}")
+            return False
+        return True
+
+    def puntuar(self, tokens: Iterable[Text]) -> List[Dict[Text, Any]]:
+        """Candidatos ordenados por puntaje (empates en el orden del catálogo), con el detalle del cálculo.
+
+        Son candidatos los documentos con al menos una acción presente en la consulta.
+        """
+        consulta = {t.lower().strip() for t in tokens if t and t.strip()}
+        candidatos = self.catalogo.candidatos_por_acciones(consulta)
+        if not candidatos:
+            return []
+
+        combinaciones = {}
+        for tamano in range(1, min(self.max_combinacion, len(consulta)) + 1):
+            for combo in combinations(sorted(consulta), tamano):
+                for id_documento in self._combinaciones.get(frozenset(combo), ()):
+                    combinaciones.setdefault(id_documento, []).append(list(combo))
+
+        resultados = []
+        for doc in candidatos:
+            id_documento = doc.get("ID_Documento")
+            acciones = sorted(consulta & self.catalogo.acciones(doc))
+            combos = combinaciones.get(id_documento, [])
+            prioritarios = sorted(t for t in consulta if id_documento in self._prioritarios.get(t, ()))
+            puntaje = (
+                self.pesos["accion"] * len(acciones)
+                + self.pesos["combinacion"] * len(combos)
+                + self.pesos["token_prioritario"] * len(prioritarios)
+            )
+            resultados.append({
+                "id": id_documento,
+                "documento": doc,
+                "puntaje": puntaje,
+                "detalle": {"acciones": acciones, "combinaciones": combos, "tokens_prioritarios": prioritarios},
+            })
+        resultados.sort(key=lambda r: r["puntaje"], reverse=True)
+        return resultados
+
+    def puntuar_lote(self, consultas: Iterable[Iterable[Text]]) -> List[List[Dict[Text, Any]]]:
+        """Puntúa muchas consultas (por ejemplo, un set de prueba de NLU) con los índices ya construidos."""
+        return [self.puntuar(tokens) for tokens in consultas]
+
+
+_ENTIDAD_ACCION = re.compile(r'\[([^\]]+)\]\(accion_cert\)')
+
+
+def ejemplos_nlu(ruta_nlu: Text) -> List[Dict[Text, Any]]:
+    """Ejemplos con entidades ``accion_cert`` de un archivo NLU de Rasa (formato YAML)."""
+    import yaml
+    with open(ruta_nlu, 'r', encoding='utf-8') as f:
+        datos = yaml.safe_load(f) or {}
+    ejemplos = []
+    for bloque in datos.get("nlu", []):
+        for linea in (bloque.get("examples") or "").splitlines():
+            texto = linea.strip().lstrip("-").strip()
+            tokens = _ENTIDAD_ACCION.findall(texto)
+            if tokens:
+                ejemplos.append({"intent": bloque.get("intent"), "texto": texto, "tokens": tokens})
+    return ejemplos
+
+
+if __name__ == "__main__":
+    # Evaluación offline (desde rasa-core): python actions/certificate_scoring.py data/nlu.yml
+    def leer_json(ruta):
+        with open(ruta, 'r', encoding='utf-8-sig') as f:
+            return json.load(f)
+
+    parser = argparse.ArgumentParser(description="Puntúa los ejemplos accion_cert de un set de NLU")
+    parser.add_argument('nlu', help="Archivo NLU de Rasa en YAML")
+    parser.add_argument('--tabla', default='./files/json/prioridades_certificados.json')
+    parser.add_argument('--documentos', default='./files/json/documento_requisito.json')
+    parser.add_argument('--top', type=int, default=3)
+    args = parser.parse_args()
+
+    motor = MotorPuntajeCertificados(leer_json(args.tabla), CatalogoDocumentos(leer_json(args.documentos)))
+    ejemplos = ejemplos_nlu(args.nlu)
+    resumen = Counter()
+    for ejemplo, ranking in zip(ejemplos, motor.puntuar_lote(e["tokens"] for e in ejemplos)):
+        unico = len(ranking) == 1 or (len(ranking) > 1 and ranking[0]["puntaje"] > ranking[1]["puntaje"])
+        resumen["seleccionado" if ranking and ranking[0]["puntaje"] > 0 and unico else "aclaracion"] += 1
+        print(json.dumps({
+            "intent": ejemplo["intent"],
+            "texto": ejemplo["texto"],
+            "ranking": [{"id": r["id"], "puntaje": r["puntaje"], "detalle": r["detalle"]} for r in ranking[:args.top]],
+        }, ensure_ascii=False))
+    print(json.dumps({"ejemplos": len(ejemplos), **resumen}, ensure_ascii=False))
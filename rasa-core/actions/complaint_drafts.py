@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Text
+
+logger = logging.getLogger(__name__)
+
+
+class BorradoresReclamos:
+    """Borradores de reclamos por conversación (``tracker.sender_id``) y registro de los completos.
+
+    Cada acción del flujo de reclamos agrega sus campos al borrador de su propia
+    conversación (lectura y escritura O(1) en memoria); al completarse, el reclamo
+    se guarda con un único anexado (una línea JSON) en ``ruta_registro``. Así una
+    conversación nunca escribe en el reclamo de otra y no se reescribe el archivo
+    completo en cada turno. Los borradores sin actividad por ``ttl`` segundos se
+    descartan (el ``OrderedDict`` se mantiene ordenado por última modificación).
+    """
+
+    def __init__(self, ruta_registro: Text, ttl: float = 3600):
+        self.ruta_registro = ruta_registro
+        self.ttl = ttl
+        self._borradores: "OrderedDict[Text, Dict[Text, Any]]" = OrderedDict()
+        self._actualizados: Dict[Text, float] = {}
+        self._lock = threading.Lock()
+        self._escritura = threading.Lock()
+
+    def __len__(self):
+        return len(self._borradores)
+
+    def _expirar(self, ahora: float):
+        while self._borradores:
+            sender_id = next(iter(self._borradores))
+            if ahora - self._actualizados[sender_id] < self.ttl:
+                break
+            self._borradores.popitem(last=False)
+            del self._actualizados[sender_id]
+            logger.info(f"Borrador de reclamo descartado por inactividad: {sender_id}")
+
+    def actualizar(self, sender_id: Text, **campos: Any) -> Dict[Text, Any]:
+        """Agrega campos al borrador de la conversación y devuelve una copia del borrador."""
+        ahora = time.time()
+        with self._lock:
+            self._expirar(ahora)
+            borrador = self._borradores.pop(sender_id, {})
+            borrador.update(campos)
+            self._borradores[sender_id] = borrador
+            self._actualizados[sender_id] = ahora
+            return dict(borrador)
+
+    def obtener(self, sender_id: Text) -> Optional[Dict[Text, Any]]:
+        with self._lock:
+            borrador = self._borradores.get(sender_id)
+            return dict(borrador) if borrador is not None else None
+
+    def descartar(self, sender_id: Text):
+        with self._lock:
+            self._borradores.pop(sender_id, None)
+            self._actualizados.pop(sender_id, None)
+
+    def confirmar(self, sender_id: Text, **campos: Any) -> Dict[Text, Any]:
+        """Completa el borrador con ``campos`` y lo registra con un solo anexado. Devuelve el reclamo guardado."""
+        with self._lock:
+            borrador = self._borradores.pop(sender_id, {})
+            self._actualizados.pop(sender_id, None)
+        reclamo = {
+            "id": str(uuid.uuid4()),
+            **borrador,
+            **campos,
+            "fecha": datetime.now().isoformat(timespec='seconds'),
+        }
+        try:
+            with self._escritura:
+                directorio = os.path.dirname(self.ruta_registro)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                with open(self.ruta_registro, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(reclamo, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError:
+            # Se conserva el borrador para que un nuevo intento no pierda los datos
+            self.actualizar(sender_id, **{**borrador, **campos})
+            raise
+        return reclamo
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Text
+
+logger = logging.getLogger(__name__)
+
+
+class Instantanea:
+    """Versión inmutable de los datos: contenido de cada archivo e índices derivados.
+
+    Se reemplaza completa cuando cambia algún archivo; quien la obtiene puede usarla
+    durante todo el turno sin ver mezclas de versiones. Los datos no deben modificarse.
+    """
+
+    def __init__(self, datos: Mapping[Text, Any], firmas: Mapping[Text, tuple], indices: Mapping[Text, Any], version: int):
+        self.datos = MappingProxyType(dict(datos))
+        self.firmas = MappingProxyType(dict(firmas))
+        self.indices = MappingProxyType(dict(indices))
+        self.version = version
+
+    def __getitem__(self, nombre: Text) -> Any:
+        return self.indices[nombre]
+
+    def archivo(self, nombre: Text, por_defecto: Any = None) -> Any:
+        return self.datos.get(nombre, por_defecto)
+
+
+class RegistroDatos:
+    """Registro compartido de los archivos ``*.json`` de ``directorio`` con recarga en caliente.
+
+    Un hilo en segundo plano revisa cada ``intervalo`` segundos el mtime y tamaño de los
+    archivos, vuelve a leer solo los que cambiaron y, si alguno de ``dependencias``
+    cambió, reconstruye los índices con ``construir_indices(datos)``. Luego publica una
+    nueva ``Instantanea`` con una sola asignación, de modo que las acciones siempre leen
+    de memoria y nunca pagan un parseo completo durante un turno. Si un archivo
+    modificado no es JSON válido se conserva la versión anterior; si los índices no
+    se pueden construir en la carga inicial, ``iniciar`` lanza ``RuntimeError``.
+    """
+
+    def __init__(self, directorio: Text, construir_indices: Optional[Callable[[Mapping[Text, Any]], Dict[Text, Any]]] = None,
+                 dependencias: Optional[Iterable[Text]] = None, excluir: Iterable[Text] = (), intervalo: float = 5.0):
+        self.directorio = directorio
+        self.construir_indices = construir_indices
+        self.dependencias = set(dependencias) if dependencias is not None else None
+        self.excluir = set(excluir)
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._detener = threading.Event()
+        self._fallidos: Dict[Text, tuple] = {}  # Archivos inválidos: no se releen hasta que vuelvan a cambiar
+        self._instantanea = Instantanea({}, {}, {}, 0)
+
+    @property
+    def instantanea(self) -> Instantanea:
+        return self._instantanea
+
+    def _escanear(self) -> Dict[Text, tuple]:
+        firmas = {}
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            logger.error(f"Directorio de datos no encontrado: {self.directorio}")
+            return firmas
+        for nombre in nombres:
+            if not nombre.endswith('.json') or nombre in self.excluir:
+                continue
+            try:
+                estado = os.stat(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:
+                continue
+            firmas[nombre] = (estado.st_mtime_ns, estado.st_size)
+        return firmas
+
+    def _leer(self, nombre: Text) -> Any:
+        with open(os.path.join(self.directorio, nombre), 'r', encoding='utf-8-sig') as f:
+            return json.load(f)
+
+    def refrescar(self) -> bool:
+        """Relee los archivos modificados y publica una nueva instantánea. Devuelve True si hubo cambios."""
+        with self._lock:
+            anterior = self._instantanea
+            firmas = self._escanear()
+            datos = dict(anterior.datos)
+            cambiados = set()
+            for nombre in set(anterior.firmas) - set(firmas):
+                datos.pop(nombre, None)
+                cambiados.add(nombre)
+            for nombre, firma in firmas.items():
+                if anterior.firmas.get(nombre) == firma:
+                    continue
+                if self._fallidos.get(nombre) == firma:
+                    firmas[nombre] = anterior.firmas.get(nombre)
+                    continue
+                try:
+                    datos[nombre] = self._leer(nombre)
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.error(f"No se pudo recargar {nombre}, se mantiene la versión anterior: {e}")
+                    self._fallidos[nombre] = firma
+                    firmas[nombre] = anterior.firmas.get(nombre)
+                    continue
+                self._fallidos.pop(nombre, None)
+                cambiados.add(nombre)
+            if not cambiados and anterior.version:
+                return False
+
+            indices = anterior.indices
+            if self.construir_indices and (
+                not anterior.version or self.dependencias is None or cambiados & self.dependencias
+            ):
+                try:
+                    indices = self.construir_indices(datos)
+                except Exception as e:
+                    if not anterior.indices:
+                        # Sin índices previos las acciones no pueden funcionar: se falla al iniciar
+                        raise RuntimeError(f"No se pudieron construir los índices de datos de {self.directorio}: {e}") from e
+                    logger.error(f"Error al reconstruir los índices de datos, se mantienen los anteriores: {e}")
+            self._instantanea = Instantanea(datos, {n: f for n, f in firmas.items() if f is not None}, indices, anterior.version + 1)
+            logger.info(f"Datos recargados (versión {anterior.version + 1}): {', '.join(sorted(cambiados)) or 'carga inicial'}")
+            return True
+
+    def _vigilar(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.refrescar()
+            except Exception as e:
+                logger.error(f"Error al revisar cambios en {self.directorio}: {e}")
+
+    def iniciar(self) -> "RegistroDatos":
+        """Carga inicial (sincrónica) y arranque del hilo de vigilancia. Lanza ``RuntimeError`` si no hay índices."""
+        self.refrescar()
+        if self.intervalo > 0 and self._hilo is None:
+            self._hilo = threading.Thread(target=self._vigilar, name="registro-datos-json", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
@@ -0,0 +1,104 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Text, Tuple
+
+Documento = Dict[Text, Any]
+
+
+def _palabras(texto: Text) -> List[Text]:
+    return re.findall(r'\w+', texto.lower())
+
+
+class CatalogoDocumentos:
+    """Catálogo en memoria de ``documento_requisito.json`` con índices precalculados.
+
+    Se construye una sola vez a partir de la lista de documentos y no se modifica
+    después; todas las claves se guardan en minúsculas para que las consultas no
+    tengan que recorrer ni normalizar la lista completa en cada turno.
+    """
+
+    def __init__(self, documentos: Iterable[Documento]):
+        self.documentos: Tuple[Documento, ...] = tuple(d for d in documentos if isinstance(d, dict))
+        self._posicion = {id(doc): i for i, doc in enumerate(self.documentos)}
+        self._por_nombre: Dict[Text, Documento] = {}
+        self._por_id: Dict[Text, Documento] = {}
+        self._por_numero: Dict[Text, Documento] = {}
+        self._por_clase: Dict[Text, List[Documento]] = {}
+        self._por_accion: Dict[Text, List[Documento]] = {}
+        self._por_frase: Dict[Text, List[Documento]] = {}
+        self._acciones: Dict[int, frozenset] = {}
+        self.max_palabras_accion = 1
+
+        for doc in self.documentos:
+            nombre = doc.get("Nombre_Documento", "").lower()
+            if nombre:
+                self._por_nombre.setdefault(nombre, doc)
+            if doc.get("ID_Documento"):
+                self._por_id.setdefault(doc["ID_Documento"].upper(), doc)
+            if doc.get("numero") is not None:
+                self._por_numero.setdefault(str(doc["numero"]).strip(), doc)
+            self._por_clase.setdefault(doc.get("class", "").lower(), []).append(doc)
+            acciones = frozenset(a.lower().strip() for a in doc.get("accion", []) if isinstance(a, str) and a.strip())
+            self._acciones[id(doc)] = acciones
+            for accion in acciones:
+                self._por_accion.setdefault(accion, []).append(doc)
+                palabras = _palabras(accion)
+                if palabras:
+                    frase = self._por_frase.setdefault(" ".join(palabras), [])
+                    if doc not in frase:
+                        frase.append(doc)
+                    self.max_palabras_accion = max(self.max_palabras_accion, len(palabras))
+
+    def __len__(self):
+        return len(self.documentos)
+
+    def __iter__(self):
+        return iter(self.documentos)
+
+    def posicion(self, doc: Documento) -> int:
+        """Posición del documento en el archivo (sirve para desempatar en el orden original)."""
+        return self._posicion[id(doc)]
+
+    def por_nombre(self, nombre: Optional[Text]) -> Optional[Documento]:
+        return self._por_nombre.get(nombre.lower().strip()) if nombre else None
+
+    def por_id(self, id_documento: Optional[Text]) -> Optional[Documento]:
+        return self._por_id.get(id_documento.upper().strip()) if id_documento else None
+
+    def por_numero(self, numero: Any) -> Optional[Documento]:
+        return self._por_numero.get(str(numero).strip()) if numero is not None else None
+
+    def por_clase(self, clase: Optional[Text]) -> List[Documento]:
+        return list(self._por_clase.get(clase.lower().strip(), ())) if clase else []
+
+    def por_accion(self, token: Text) -> List[Documento]:
+        """Documentos cuya lista ``accion`` contiene exactamente ``token`` (sin distinguir mayúsculas)."""
+        return list(self._por_accion.get(token.lower().strip(), ()))
+
+    def acciones(self, doc: Documento) -> frozenset:
+        """Acciones del documento en minúsculas."""
+        return self._acciones.get(id(doc), frozenset())
+
+    def candidatos_por_acciones(self, tokens: Iterable[Text]) -> List[Documento]:
+        """Documentos con al menos una de las acciones indicadas, en el orden del archivo."""
+        encontrados = {}
+        for token in tokens:
+            for doc in self._por_accion.get(token.lower().strip(), ()):
+                encontrados[id(doc)] = doc
+        return sorted(encontrados.values(), key=self.posicion)
+
+    def buscar_por_texto_accion(self, texto: Optional[Text]) -> Optional[Documento]:
+        """Primer documento (en el orden del archivo) con alguna acción que aparezca como frase en ``texto``.
+
+        Se consultan en el índice los n-gramas de palabras del texto, hasta el largo de
+        la acción más larga, en lugar de probar cada acción de cada documento.
+        """
+        if not texto:
+            return None
+        palabras = _palabras(texto)
+        mejor = None
+        for n in range(1, self.max_palabras_accion + 1):
+            for i in range(len(palabras) - n + 1):
+                for doc in self._por_frase.get(" ".join(palabras[i:i + n]), ()):
+                    if mejor is None or self.posicion(doc) < self.posicion(mejor):
+                        mejor = doc
+        return mejor
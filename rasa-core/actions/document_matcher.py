@@ -0,0 +1,96 @@
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+from .document_catalog import CatalogoDocumentos, Documento
+
+logger = logging.getLogger(__name__)
+
+_NO_PALABRA = re.compile(r'[^\w°]+')
+
+
+def normalizar_texto(texto: Text) -> Text:
+    """Minúsculas, sin tildes y con cualquier puntuación reducida a un espacio."""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _NO_PALABRA.sub(' ', texto).strip()
+
+
+def _alternativas(frases) -> Text:
+    # Las frases más largas primero: en una misma posición gana la coincidencia más específica
+    return "|".join(re.escape(f).replace(r'\ ', r'\s+') for f in sorted(frases, key=len, reverse=True))
+
+
+class NormalizadorDocumentos:
+    """Reconoce el documento al que se refiere el usuario con una sola expresión regular compilada.
+
+    La tabla (``files/json/sinonimos_documentos.json``) asocia sinónimos a cada
+    ``ID_Documento`` y define los prefijos ("opción", "número", ...) y los números
+    escritos en palabras. Todo se compara sin tildes ni mayúsculas y en una sola
+    pasada sobre el texto. Si hay varias coincidencias gana una referencia por
+    número; luego la frase más larga y, en empate, el documento que aparece antes
+    en la tabla.
+    """
+
+    def __init__(self, tabla: Any, catalogo: CatalogoDocumentos):
+        self.catalogo = catalogo
+        tabla = tabla if isinstance(tabla, dict) else {}
+        self._numeros: Dict[Text, int] = {
+            normalizar_texto(palabra): int(valor) for palabra, valor in tabla.get("numeros", {}).items()
+        }
+        self._sinonimos: Dict[Text, Tuple[int, Text]] = {}
+        for orden, entrada in enumerate(tabla.get("documentos", [])):
+            if catalogo.por_id(entrada.get("id")) is None:
+                logger.warning(f"Sinónimos para un documento inexistente en el catálogo: {entrada.get('id')}")
+                continue
+            for sinonimo in entrada.get("sinonimos", []):
+                self._sinonimos.setdefault(normalizar_texto(sinonimo), (orden, entrada["id"]))
+        # Los nombres completos del catálogo también cuentan como sinónimos
+        for doc in catalogo:
+            nombre = normalizar_texto(doc.get("Nombre_Documento", ""))
+            if nombre and doc.get("ID_Documento"):
+                self._sinonimos.setdefault(nombre, (len(self._sinonimos), doc["ID_Documento"]))
+
+        prefijos = {normalizar_texto(p) for p in tabla.get("prefijos_numero", []) if p.strip()}
+        numero = r'\d+' + (f"|{_alternativas(self._numeros)}" if self._numeros else "")
+        partes = []
+        if prefijos:
+            partes.append(rf'(?:{_alternativas(prefijos)})\s*(?P<numero>{numero})')
+        if self._sinonimos:
+            partes.append(f"(?P<sinonimo>{_alternativas(self._sinonimos)})")
+        self._patron = re.compile(r'\b(?:' + "|".join(partes) + r')\b') if partes else None
+        self._solo_numero = re.compile(rf'(?:{numero})')
+
+    def _numero(self, texto: Text) -> Optional[Documento]:
+        texto = re.sub(r'\s+', ' ', texto)
+        valor = int(texto) if texto.isdigit() else self._numeros.get(texto)
+        return self.catalogo.por_numero(valor) if valor is not None else None
+
+    def coincidencias(self, valor: Text) -> List[Tuple[Tuple[int, int, int], Documento, Text]]:
+        """Todas las referencias encontradas como (prioridad, documento, texto coincidente)."""
+        texto = normalizar_texto(valor)
+        encontrados = []
+        if self._solo_numero.fullmatch(texto):
+            doc = self._numero(texto)
+            if doc is not None:
+                encontrados.append(((0, 0, 0), doc, texto))
+        if self._patron is None:
+            return encontrados
+        for coincidencia in self._patron.finditer(texto):
+            if coincidencia.lastgroup == 'numero':
+                doc = self._numero(coincidencia.group('numero'))
+                if doc is not None:
+                    encontrados.append(((0, 0, 0), doc, coincidencia.group(0)))
+                continue
+            frase = re.sub(r'\s+', ' ', coincidencia.group('sinonimo'))
+            orden, id_documento = self._sinonimos[frase]
+            encontrados.append(((1, -len(frase), orden), self.catalogo.por_id(id_documento), coincidencia.group(0)))
+        return encontrados
+
+    def resolver(self, valor: Optional[Text]) -> Optional[Documento]:
+        """Documento del catálogo al que se refiere ``valor``, o None."""
+        if not valor:
+            return None
+        encontrados = self.coincidencias(valor)
+        return min(encontrados, key=lambda c: c[0])[1] if encontrados else None
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Text
+
+import aiohttp
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+LATENCIA_GATEWAY = Histogram('llm_gateway_cliente_segundos', 'Latencia de las consultas a llm-gateway', ['resultado'])
+ERRORES_GATEWAY = Counter('llm_gateway_cliente_errores_total', 'Consultas fallidas a llm-gateway por tipo', ['tipo'])
+CONSULTAS_DUPLICADAS = Counter('llm_gateway_cliente_hedge_total', 'Consultas repetidas por demora de la primera (hedging)')
+RECHAZOS_CIRCUITO = Counter('llm_gateway_cliente_circuito_rechazos_total', 'Consultas no enviadas por circuito abierto')
+ESTADO_CIRCUITO = Gauge('llm_gateway_cliente_circuito_abierto', '1 si el circuito hacia llm-gateway está abierto')
+
+
+class GatewayNoDisponible(Exception):
+    """llm-gateway no respondió (circuito abierto, saturación, timeout o error)."""
+
+
+class _Saturado(Exception):
+    # 503 de llm-gateway: cola de generación llena
+    def __init__(self, reintentar_en: Optional[float]):
+        super().__init__("saturado")
+        self.reintentar_en = reintentar_en
+
+
+class CircuitBreaker:
+    """Circuito cerrado / abierto / semiabierto según los fallos consecutivos.
+
+    Tras ``umbral_fallos`` fallos seguidos (o una respuesta 503 de saturación) el
+    circuito se abre durante ``enfriamiento`` segundos (o lo que indique
+    ``Retry-After``) y las consultas se rechazan sin tocar la red. Pasado ese
+    tiempo se deja pasar una sola consulta de prueba: si responde, se cierra.
+    """
+
+    def __init__(self, umbral_fallos: int = 5, enfriamiento: float = 30.0):
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+
+    @property
+    def abierto(self) -> bool:
+        return self._abierto_hasta > 0
+
+    def permitir(self) -> bool:
+        if not self.abierto:
+            return True
+        if time.monotonic() < self._abierto_hasta or self._prueba_en_curso:
+            return False
+        self._prueba_en_curso = True
+        return True
+
+    def fin_prueba(self):
+        # La consulta de prueba terminó sin registrar éxito ni fallo (p. ej. Rasa canceló la acción):
+        # la siguiente consulta vuelve a probar en lugar de dejar el circuito abierto para siempre
+        self._prueba_en_curso = False
+
+    def exito(self):
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        ESTADO_CIRCUITO.set(0)
+
+    def fallo(self, reintentar_en: Optional[float] = None):
+        self._fallos += 1
+        self._prueba_en_curso = False
+        if reintentar_en is not None or self._fallos >= self.umbral_fallos or self.abierto:
+            self._abierto_hasta = time.monotonic() + (reintentar_en if reintentar_en is not None else self.enfriamiento)
+            ESTADO_CIRCUITO.set(1)
+
+
+class ClienteGateway:
+    """Cliente asíncrono de ``POST /process`` de llm-gateway para el servidor de acciones.
+
+    Usa una ``aiohttp.ClientSession`` con pool de conexiones keep-alive (una por
+    event loop), autenticación básica, un timeout de conexión corto y un timeout
+    total que debe cubrir la generación del modelo (``LLM_TIMEOUT_SECONDS`` del
+    gateway). Con ``hedge_segundos`` > 0, si la primera solicitud no respondió en
+    ese tiempo se envía una segunda en paralelo y se usa la que termine antes
+    (como máximo dos en vuelo); viene desactivado porque con el modelo en CPU y
+    una sola réplica cada duplicado es otra generación completa en la cola. Un
+    ``CircuitBreaker`` evita esperar al gateway cuando está caído o saturado.
+    """
+
+    def __init__(self, url: Text, usuario: Optional[Text] = None, clave: Optional[Text] = None,
+                 timeout: float = 125.0, timeout_conexion: float = 3.0, hedge_segundos: float = 0.0,
+                 max_conexiones: int = 20, circuito: Optional[CircuitBreaker] = None):
+        self.url = url
+        self.auth = aiohttp.BasicAuth(usuario, clave or "") if usuario else None
+        self.timeout = timeout
+        self.timeout_conexion = timeout_conexion
+        self.hedge_segundos = hedge_segundos
+        self.max_conexiones = max_conexiones
+        self.circuito = circuito or CircuitBreaker()
+        self._sesion: Optional[aiohttp.ClientSession] = None
+
+    def _obtener_sesion(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._sesion is None or self._sesion.closed or self._sesion._loop is not loop:
+            self._sesion = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_conexiones, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.timeout_conexion),
+                auth=self.auth,
+            )
+        return self._sesion
+
+    async def _enviar(self, pregunta: Text) -> Dict[Text, Any]:
+        async with self._obtener_sesion().post(self.url, json={"question": pregunta}) as respuesta:
+            if respuesta.status == 503:
+                reintento = respuesta.headers.get("Retry-After", "")
+                raise _Saturado(float(reintento) if reintento.isdigit() else None)
+            respuesta.raise_for_status()
+            return await respuesta.json()
+
+    async def _enviar_con_hedge(self, pregunta: Text) -> Dict[Text, Any]:
+        primera = asyncio.ensure_future(self._enviar(pregunta))
+        if self.hedge_segundos <= 0:
+            return await primera
+        hechas, _ = await asyncio.wait({primera}, timeout=self.hedge_segundos)
+        if hechas:
+            return primera.result()
+        CONSULTAS_DUPLICADAS.inc()
+        pendientes = {primera, asyncio.ensure_future(self._enviar(pregunta))}
+        error = None
+        try:
+            while pendientes:
+                hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in hechas:
+                    if tarea.exception() is None:
+                        return tarea.result()
+                    error = tarea.exception()
+            raise error
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+
+    async def preguntar(self, pregunta: Text) -> Dict[Text, Any]:
+        """Respuesta de ``/process`` (``respuesta``, ``fuente``, ``tipo``...). Lanza ``GatewayNoDisponible``."""
+        prueba = self.circuito.abierto
+        if not self.circuito.permitir():
+            RECHAZOS_CIRCUITO.inc()
+            raise GatewayNoDisponible("circuito abierto")
+        inicio = time.perf_counter()
+        try:
+            resultado = await self._enviar_con_hedge(pregunta)
+        except _Saturado as e:
+            self._registrar_fallo("saturado", inicio, e.reintentar_en or self.circuito.enfriamiento)
+            raise GatewayNoDisponible("llm-gateway saturado") from e
+        except asyncio.TimeoutError as e:
+            self._registrar_fallo("timeout", inicio)
+            raise GatewayNoDisponible("timeout") from e
+        except aiohttp.ClientResponseError as e:
+            self._registrar_fallo(f"http_{e.status}", inicio)
+            raise GatewayNoDisponible(f"HTTP {e.status}") from e
+        except (aiohttp.ClientError, ValueError) as e:
+            self._registrar_fallo("conexion", inicio)
+            raise GatewayNoDisponible(str(e)) from e
+        finally:
+            if prueba:
+                self.circuito.fin_prueba()
+        self.circuito.exito()
+        LATENCIA_GATEWAY.labels("ok").observe(time.perf_counter() - inicio)
+        return resultado
+
+    def _registrar_fallo(self, tipo: Text, inicio: float, reintentar_en: Optional[float] = None):
+        ERRORES_GATEWAY.labels(tipo).inc()
+        LATENCIA_GATEWAY.labels("error").observe(time.perf_counter() - inicio)
+        self.circuito.fallo(reintentar_en)
+        logger.warning(f"Consulta a llm-gateway fallida ({tipo})")
@@ -0,0 +1,192 @@
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Text, Tuple
+
+from .document_matcher import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+# Palabras vacías frecuentes en las preguntas; no aportan al ranking
+PALABRAS_VACIAS = frozenset("""
+a al algo como con cual cuales cuando de del donde el ella en es esa ese esta este esto hay la las le lo los me mi
+mas muy no o para pero por que quien se si sin sobre su sus te tengo tiene un una uno y ya yo puedo quiero saber
+""".split())
+
+_PARRAFOS = re.compile(r'\n\s*\n')
+
+
+def _raiz(termino: Text) -> Text:
+    # Reducción liviana para español: sin "s" ni "e" finales y truncado a 7 letras, de modo que
+    # singular y plural comparten raíz (patente/patentes -> patent, calle/calles -> call, ley/leyes -> ley)
+    if len(termino) > 3 and termino.endswith('s'):
+        termino = termino[:-1]
+    if len(termino) > 3 and termino.endswith('e'):
+        termino = termino[:-1]
+    return termino[:7]
+
+
+def tokenizar(texto: Text) -> List[Text]:
+    """Términos de búsqueda: minúsculas, sin tildes, sin puntuación ni palabras vacías, reducidos a su raíz."""
+    return [_raiz(t) for t in normalizar_texto(texto).split() if len(t) > 1 and t not in PALABRAS_VACIAS]
+
+
+class Pasaje(NamedTuple):
+    archivo: Text
+    texto: Text
+
+
+def dividir_pasajes(archivo: Text, contenido: Text, max_palabras: int = 120) -> List[Pasaje]:
+    """Agrupa párrafos consecutivos en pasajes de hasta ``max_palabras`` palabras.
+
+    Los párrafos cortos (títulos) quedan junto al texto que los sigue y los
+    párrafos más largos que el límite se cortan en ventanas.
+    """
+    pasajes: List[Pasaje] = []
+    actual: List[Text] = []
+    for parrafo in _PARRAFOS.split(contenido):
+        palabras = parrafo.split()
+        if actual and len(actual) + len(palabras) > max_palabras:
+            pasajes.append(Pasaje(archivo, ' '.join(actual)))
+            actual = []
+        while len(palabras) > max_palabras:
+            pasajes.append(Pasaje(archivo, ' '.join(palabras[:max_palabras])))
+            palabras = palabras[max_palabras:]
+        actual.extend(palabras)
+    if actual:
+        pasajes.append(Pasaje(archivo, ' '.join(actual)))
+    return pasajes
+
+
+class IndiceBM25:
+    """Índice invertido (término -> [(pasaje, frecuencia)]) con ranking BM25."""
+
+    def __init__(self, pasajes: List[Pasaje], k1: float = 1.5, b: float = 0.75):
+        self.pasajes = pasajes
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[Text, List[Tuple[int, int]]] = {}
+        self._largos: List[int] = []
+        for i, pasaje in enumerate(pasajes):
+            terminos = Counter(tokenizar(pasaje.texto))
+            self._largos.append(sum(terminos.values()))
+            for termino, frecuencia in terminos.items():
+                self._postings.setdefault(termino, []).append((i, frecuencia))
+        self._promedio = (sum(self._largos) / len(self._largos)) if self._largos else 0.0
+        n = len(pasajes)
+        self._idf = {
+            termino: math.log(1 + (n - len(lista) + 0.5) / (len(lista) + 0.5))
+            for termino, lista in self._postings.items()
+        }
+
+    def __len__(self):
+        return len(self.pasajes)
+
+    def buscar(self, consulta: Text, limite: int = 3) -> List[Tuple[float, float, Pasaje]]:
+        """Los ``limite`` pasajes con mayor puntaje BM25, como (puntaje, cobertura, pasaje).
+
+        La cobertura es la fracción de términos de la consulta presentes en el pasaje.
+        Solo se recorren las listas de los términos de la consulta.
+        """
+        terminos = set(tokenizar(consulta))
+        puntajes: Dict[int, float] = {}
+        coincidencias: Counter = Counter()
+        for termino in terminos:
+            idf = self._idf.get(termino)
+            if idf is None:
+                continue
+            for i, frecuencia in self._postings[termino]:
+                normalizacion = self.k1 * (1 - self.b + self.b * self._largos[i] / self._promedio)
+                puntajes[i] = puntajes.get(i, 0.0) + idf * frecuencia * (self.k1 + 1) / (frecuencia + normalizacion)
+                coincidencias[i] += 1
+        mejores = sorted(puntajes.items(), key=lambda p: p[1], reverse=True)[:limite]
+        return [(puntaje, coincidencias[i] / len(terminos), self.pasajes[i]) for i, puntaje in mejores]
+
+
+class BuscadorDocumentos:
+    """Búsqueda BM25 sobre los ``*.txt`` de ``directorio``, con recarga cuando cambian.
+
+    El índice se construye al iniciar y un hilo revisa cada ``intervalo`` segundos
+    el mtime y tamaño de los archivos; si alguno cambió, relee solo esos archivos y
+    publica un índice nuevo con una sola asignación. Las consultas nunca leen disco.
+    """
+
+    def __init__(self, directorio: Text, intervalo: float = 30.0, max_palabras: int = 120,
+                 puntaje_minimo: float = 1.0, cobertura_minima: float = 0.5):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.max_palabras = max_palabras
+        self.puntaje_minimo = puntaje_minimo
+        self.cobertura_minima = cobertura_minima
+        self.indice = IndiceBM25([])
+        self._firmas: Dict[Text, tuple] = {}
+        self._pasajes: Dict[Text, List[Pasaje]] = {}
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._cargado = False
+
+    def _escanear(self) -> Dict[Text, tuple]:
+        firmas = {}
+        if not os.path.isdir(self.directorio):
+            return firmas
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith('.txt'):
+                continue
+            try:
+                estado = os.stat(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:
+                continue
+            firmas[nombre] = (estado.st_mtime_ns, estado.st_size)
+        return firmas
+
+    def refrescar(self) -> bool:
+        """Reconstruye el índice si algún archivo cambió. Devuelve True si hubo cambios."""
+        with self._lock:
+            firmas = self._escanear()
+            if self._cargado and firmas == self._firmas:
+                return False
+            pasajes = {}
+            for nombre, firma in firmas.items():
+                if self._firmas.get(nombre) == firma:
+                    pasajes[nombre] = self._pasajes[nombre]
+                    continue
+                try:
+                    with open(os.path.join(self.directorio, nombre), 'r', encoding='utf-8') as f:
+                        pasajes[nombre] = dividir_pasajes(nombre, f.read(), self.max_palabras)
+                except (OSError, UnicodeDecodeError) as e:
+                    # Se conserva la firma: no se reintenta hasta que el archivo vuelva a cambiar
+                    logger.error(f"No se pudo indexar {nombre}: {e}")
+                    pasajes[nombre] = []
+            self.indice = IndiceBM25([p for nombre in sorted(pasajes) for p in pasajes[nombre]])
+            self._pasajes, self._firmas = pasajes, firmas
+            self._cargado = True
+            logger.info(f"Índice de documentos locales: {len(pasajes)} archivos, {len(self.indice)} pasajes")
+            return True
+
+    def _vigilar(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.refrescar()
+            except Exception as e:
+                logger.error(f"Error al actualizar el índice de {self.directorio}: {e}")
+
+    def iniciar(self) -> "BuscadorDocumentos":
+        self.refrescar()
+        if self.intervalo > 0 and self._hilo is None:
+            self._hilo = threading.Thread(target=self._vigilar, name="buscador-documentos", daemon=True)
+            self._hilo.start()
+        return self
+
+    def mejor_pasaje(self, consulta: Text) -> Optional[Pasaje]:
+        """El pasaje mejor rankeado, o None si no alcanza ``puntaje_minimo`` o cubre muy pocos términos de la consulta."""
+        resultados = self.indice.buscar(consulta, limite=1)
+        if resultados:
+            puntaje, cobertura, pasaje = resultados[0]
+            if puntaje >= self.puntaje_minimo and cobertura >= self.cobertura_minima:
+                return pasaje
+        return None
@@ -0,0 +1,84 @@
+import heapq
+import logging
+import threading
+import time
+from typing import Any, Dict, Text
+
+from prometheus_client import Counter, Gauge
+
+from .booking_store import AgendaCitas, CONFIRMADO, PENDIENTE
+
+logger = logging.getLogger(__name__)
+
+RESERVAS_CREADAS = Counter('agenda_reservas_creadas_total', 'Horarios reservados temporalmente (pending)')
+RESERVAS_CONFIRMADAS = Counter('agenda_reservas_confirmadas_total', 'Reservas confirmadas por el usuario')
+RESERVAS_EXPIRADAS = Counter('agenda_reservas_expiradas_total', 'Reservas pendientes liberadas por vencimiento')
+RESERVAS_PENDIENTES = Gauge('agenda_reservas_pendientes', 'Horarios actualmente en estado pending')
+HORARIOS_CONFIRMADOS = Gauge('agenda_horarios_confirmados', 'Horarios actualmente en estado confirmed')
+
+
+class BarredorReservas:
+    """Libera las reservas ``pending`` que no se confirman dentro de ``ttl`` segundos.
+
+    Los vencimientos se guardan en un min-heap (vence, cod_fun, hora, actualizado):
+    registrar una reserva cuesta O(log n) y el hilo barredor duerme hasta el próximo
+    vencimiento en lugar de recorrer la agenda. Al vencer, la reserva se libera con
+    ``AgendaCitas.expirar``, que solo actúa si el horario sigue pendiente con la misma
+    marca ``actualizado``; las entradas de reservas ya confirmadas o reemplazadas se
+    descartan sin costo adicional.
+    """
+
+    def __init__(self, agenda: AgendaCitas, ttl: float):
+        self.agenda = agenda
+        self.ttl = ttl
+        self._heap = []
+        self._condicion = threading.Condition()
+        self._hilo = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def registrar(self, reserva: Dict[Text, Any]):
+        """Agrega el vencimiento de una reserva recién creada (resultado de ``AgendaCitas.reservar``)."""
+        RESERVAS_CREADAS.inc()
+        self._agregar(reserva["cod_fun"], reserva["hora"], reserva["actualizado"])
+
+    def _agregar(self, cod_fun: Text, hora: Text, actualizado: float):
+        with self._condicion:
+            entrada = (actualizado + self.ttl, cod_fun, hora, actualizado)
+            heapq.heappush(self._heap, entrada)
+            # Si pasó a ser el próximo vencimiento, el barredor debe recalcular su espera
+            if self._heap[0] is entrada:
+                self._condicion.notify()
+
+    def iniciar(self) -> "BarredorReservas":
+        """Carga los pendientes existentes (p. ej. tras un reinicio) y lanza el hilo barredor."""
+        for pendiente in self.agenda.pendientes():
+            self._agregar(pendiente["cod_fun"], pendiente["hora"], pendiente["actualizado"] or time.time())
+        RESERVAS_PENDIENTES.set_function(lambda: self.agenda.contar(PENDIENTE))
+        HORARIOS_CONFIRMADOS.set_function(lambda: self.agenda.contar(CONFIRMADO))
+        if self.ttl > 0 and self._hilo is None:
+            self._hilo = threading.Thread(target=self._barrer, name="barredor-reservas", daemon=True)
+            self._hilo.start()
+        return self
+
+    def _vencidos(self):
+        with self._condicion:
+            while True:
+                ahora = time.time()
+                if self._heap and self._heap[0][0] <= ahora:
+                    vencidos = []
+                    while self._heap and self._heap[0][0] <= ahora:
+                        vencidos.append(heapq.heappop(self._heap))
+                    return vencidos
+                self._condicion.wait(self._heap[0][0] - ahora if self._heap else None)
+
+    def _barrer(self):
+        while True:
+            for _, cod_fun, hora, actualizado in self._vencidos():
+                try:
+                    if self.agenda.expirar(cod_fun, hora, actualizado):
+                        RESERVAS_EXPIRADAS.inc()
+                        logger.info(f"Reserva pendiente vencida liberada: {cod_fun} {hora}")
+                except Exception as e:
+                    logger.error(f"Error al liberar la reserva vencida {cod_fun} {hora}: {e}")
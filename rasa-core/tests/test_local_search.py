@@ -0,0 +1,31 @@
+import os
+import sys
+import types
+
+# Se cargan los módulos de actions/ sin ejecutar actions/__init__.py (que importa el servidor de acciones completo)
+_ACCIONES = os.path.join(os.path.dirname(__file__), '..', 'actions')
+if 'actions' not in sys.modules:
+    paquete = types.ModuleType('actions')
+    paquete.__path__ = [_ACCIONES]
+    sys.modules['actions'] = paquete
+
+from actions.local_search import BuscadorDocumentos, tokenizar
+
+
+def test_singular_y_plural_comparten_raiz():
+    for singular, plural in [("patente", "patentes"), ("clase", "clases"), ("calle", "calles"),
+                             ("registro", "registros"), ("ley", "leyes"), ("trámite", "trámites")]:
+        assert tokenizar(singular) == tokenizar(plural), (singular, plural)
+
+
+def test_consulta_en_singular_encuentra_pasaje_en_plural(tmp_path):
+    (tmp_path / 'patentes.txt').write_text(
+        "Patentes comerciales\n\nLas patentes comerciales se renuevan cada semestre en la Dirección de Rentas.",
+        encoding='utf-8')
+    (tmp_path / 'basura.txt').write_text(
+        "Retiro de basura\n\nEl camión recolector pasa por cada calle del sector tres veces por semana.", encoding='utf-8')
+    (tmp_path / 'licencias.txt').write_text(
+        "Licencias de conducir\n\nLa licencia de conducir clase B se solicita en la Dirección de Tránsito.", encoding='utf-8')
+    buscador = BuscadorDocumentos(str(tmp_path), intervalo=0).iniciar()
+    pasaje = buscador.mejor_pasaje("¿Cómo renuevo mi patente comercial?")
+    assert pasaje is not None and pasaje.archivo == 'patentes.txt'
@@ -1,13 +1,11 @@
 from flask import Flask, jsonify, request, Response
 from apscheduler.schedulers.background import BackgroundScheduler
-import json
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-import requests
 import pytz
-from datetime import datetime, timedelta
+from datetime import datetime
+import tasks
 from tasks import setup_scheduler
+from storage import AppointmentStore
 import prometheus_client
 from prometheus_client import Counter, Gauge, Histogram
 
@@ -23,66 +21,16 @@ WHATSAPP_ERRORS = Counter('whatsapp_errors_total', 'Total de errores al enviar m
 ACTIVE_APPOINTMENTS = Gauge('active_appointments', 'Número de citas activas')
 REMINDER_DURATION = Histogram('reminder_duration_seconds', 'Duración del proceso de envío de recordatorios')
 
-# Configuración de WhatsApp (Meta Cloud API)
-META_PHONE_ID = os.getenv('META_PHONE_ID')
-META_TOKEN = os.getenv('META_TOKEN')
+# Base de citas (SQLite); la primera vez importa data/appointments.json
+APPOINTMENTS_DB = os.getenv('APPOINTMENTS_DB', 'data/appointments.db')
+STORE = AppointmentStore(APPOINTMENTS_DB).init('data/appointments.json')
 
-# Función para enviar recordatorio
+# Función para enviar recordatorio (envío concurrente en tasks.send_reminder)
 def send_reminder():
-    with prometheus_client.REGISTRY.timer() as timer:
-        with open('data/appointments.json', 'r') as f:
-            citas = json.load(f)['citas']
-        
-        tomorrow = datetime.now(pytz.timezone('America/Santiago')) + timedelta(days=1)
-        tomorrow_str = tomorrow.strftime("%Y-%m-%d")
-        
-        for cita in citas:
-            if cita['fecha'] == tomorrow_str and cita['AVLB'] == 0 and cita['USU_CONF'] == 1:
-                # Enviar correo
-                send_email(cita)
-                # Enviar WhatsApp (si hay número)
-                if cita['USU_WHATSAPP']:
-                    send_whatsapp(cita)
-        
-        # Actualizar métrica de duración
-        REMINDER_DURATION.observe(timer.sum())
-
-# Función de correo (SendGrid)
-def send_email(cita):
-    message = Mail(
-        from_email=os.getenv('SENDER_EMAIL'),
-        to_emails=cita['USU_MAIL'],
-        subject='Recordatorio de cita',
-        plain_text_content=f"Su cita es mañana {cita['fecha']} a las {cita['hora']} con {cita['FUNC']}."
-    )
-    try:
-        sg = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        sg.send(message)
-    except Exception as e:
-        EMAIL_ERRORS.inc()
-        app.logger.error(f"Error en correo: {str(e)}")
-
-# Función de WhatsApp (Meta Cloud API)
-def send_whatsapp(cita):
-    try:
-        import requests
-        phone_number = cita['USU_WHATSAPP'].replace('+', '')
-        url = f"https://graph.facebook.com/v19.0/{META_PHONE_ID}/messages"
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": phone_number,
-            "type": "text",
-            "text": { "body": f"Recordatorio: Su cita es mañana {cita['fecha']} a las {cita['hora']} con {cita['FUNC']}." }
-        }
-        headers = {
-            "Authorization": f"Bearer {META_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-    except Exception as e:
-        WHATSAPP_ERRORS.inc()
-        app.logger.error(f"Error en WhatsApp: {str(e)}")
+    with REMINDER_DURATION.time():
+        summary = tasks.send_reminder()
+    EMAIL_ERRORS.inc(summary['email']['error'])
+    WHATSAPP_ERRORS.inc(summary['whatsapp']['error'])
 
 # Programar el recordatorio diario
 scheduler.add_job(
@@ -93,6 +41,15 @@ scheduler.add_job(
     id='daily_reminder'
 )
 
+# Archivar los días pasados cada madrugada (un solo worker lo ejecuta, ver tasks.archive_past_appointments)
+scheduler.add_job(
+    tasks.archive_past_appointments,
+    'cron',
+    hour=3,
+    minute=0,
+    id='daily_archive'
+)
+
 # Endpoint para crear cita (agregado validación de confirmación)
 @app.route('/create-appointment', methods=['POST'])
 def create_appointment():
@@ -102,57 +59,59 @@ def create_appointment():
         if not data.get(field):
             return jsonify({"error": f"Falta {field}"}), 400
 
-    with open('data/appointments.json', 'r') as f:
-        citas = json.load(f)['citas']
-    
-    selected = next(
-        (c for c in citas 
-         if c["AVLB"] == 1 
-         and c["fecha"] == data["fecha"]
-         and c["hora"] == data["hora"]),
-        None
-    )
+    # Reserva atómica del primer bloque libre (fecha, hora)
+    selected = STORE.book(data.get("fecha"), data.get("hora"), data, data.get("COD_FUNC"))
 
     if not selected:
         return jsonify({"error": "No hay citas disponibles"}), 404
 
-    selected['MOTIV'] = data['MOTIV']
-    selected['USU_NAME'] = data['USU_NAME']
-    selected['USU_MAIL'] = data['USU_MAIL']
-    selected['USU_WHATSAPP'] = data['USU_WHATSAPP']
-    selected['AVLB'] = 0  # Marcamos como ocupado
-
-    with open('data/appointments.json', 'w') as f:
-        json.dump({"citas": citas}, f, indent=4)
-    
     # Incrementar contador de citas creadas
     APPOINTMENTS_CREATED.inc()
-    
+
     # Actualizar número de citas activas
-    active_count = sum(1 for c in citas if c['AVLB'] == 0)
-    ACTIVE_APPOINTMENTS.set(active_count)
+    ACTIVE_APPOINTMENTS.set(STORE.count(AVLB=0))
 
     return jsonify(selected), 201
 
 # Endpoint para confirmar cita (actualizar USU_CONF)
 @app.route('/confirm-appointment/<string:id>', methods=['POST'])
 def confirm_appointment(id):
-    with open('data/appointments.json', 'r') as f:
-        citas = json.load(f)['citas']
-    
-    for cita in citas:
-        if cita['ID'] == id and cita['AVLB'] == 0:
-            cita['USU_CONF'] = 1
-            with open('data/appointments.json', 'w') as f:
-                json.dump({"citas": citas}, f, indent=4)
-            
-            # Incrementar contador de citas confirmadas
-            APPOINTMENTS_CONFIRMED.inc()
-            
-            return jsonify({"status": "confirmada"}), 200
+    if STORE.confirm(id):
+        # Incrementar contador de citas confirmadas
+        APPOINTMENTS_CONFIRMED.inc()
+
+        return jsonify({"status": "confirmada"}), 200
 
     return jsonify({"error": "Cita no encontrada"}), 404
 
+# Consultas de disponibilidad (usan los índices de la base)
+@app.route('/availability/next', methods=['GET'])
+def availability_next():
+    n = request.args.get('n', default=10, type=int)
+    fecha = request.args.get('fecha')
+    hora = request.args.get('hora')
+    if not fecha:
+        ahora = datetime.now(pytz.timezone('America/Santiago'))
+        fecha, hora = ahora.strftime("%Y-%m-%d"), ahora.strftime("%H:%M")
+    return jsonify(STORE.next_free(n, fecha, hora)), 200
+
+@app.route('/availability/date/<string:fecha>', methods=['GET'])
+def availability_on_date(fecha):
+    return jsonify(STORE.free_on(fecha)), 200
+
+@app.route('/availability/funcionario/<string:cod_func>', methods=['GET'])
+def availability_for_funcionario(cod_func):
+    fecha = request.args.get('fecha')
+    limit = request.args.get('limit', default=None, type=int)
+    return jsonify(STORE.free_for(cod_func, fecha, limit)), 200
+
+# Agenda del día (citas ocupadas), por defecto la de hoy
+@app.route('/agenda', methods=['GET'])
+@app.route('/agenda/<string:fecha>', methods=['GET'])
+def agenda(fecha=None):
+    fecha = fecha or datetime.now(pytz.timezone('America/Santiago')).strftime("%Y-%m-%d")
+    return jsonify(STORE.agenda(fecha)), 200
+
 # Endpoint para métricas de Prometheus
 @app.route('/metrics', methods=['GET'])
 def metrics():
@@ -165,10 +124,7 @@ if __name__ == "__main__":
     setup_scheduler()  # Iniciar el scheduler al iniciar el servicio
     # Inicializar métricas con valores iniciales
     try:
-        with open('data/appointments.json', 'r') as f:
-            citas = json.load(f)['citas']
-            active_count = sum(1 for c in citas if c['AVLB'] == 0)
-            ACTIVE_APPOINTMENTS.set(active_count)
+        ACTIVE_APPOINTMENTS.set(STORE.count(AVLB=0))
     except Exception as e:
         app.logger.error(f"Error al inicializar métricas: {str(e)}")
     
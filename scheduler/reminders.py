@@ -0,0 +1,215 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Endpoints configurables (por ejemplo, para probar contra un stub local)
+SENDGRID_API_URL = os.getenv('SENDGRID_API_URL', 'https://api.sendgrid.com/v3/mail/send')
+META_API_URL = os.getenv('META_API_URL', 'https://graph.facebook.com/v19.0')
+
+REMINDER_SEND_SECONDS = Histogram('reminder_send_seconds', 'Latencia de cada envío de recordatorio (incluye reintentos)', ['channel'])
+REMINDER_MESSAGES = Counter('reminder_messages_total', 'Recordatorios procesados por canal y resultado', ['channel', 'result'])
+REMINDER_RETRIES = Counter('reminder_retries_total', 'Reintentos de envío de recordatorios', ['channel'])
+
+
+class RateLimiter:
+    """Token bucket compartido por los hilos que envían a un mismo proveedor."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Channel:
+    """Proveedor de envío: sesión HTTP con pool de conexiones y límite de tasa propio."""
+
+    def __init__(self, name, rate, pool_size):
+        self.name = name
+        self.limiter = RateLimiter(rate)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+
+class ReminderDispatcher:
+    """Envía los recordatorios de citas por correo (SendGrid) y WhatsApp (Meta Cloud API).
+
+    Los envíos se reparten en un pool acotado de hilos; cada canal reutiliza una
+    sesión HTTP (keep-alive), respeta su propio límite de mensajes por segundo y
+    reintenta con backoff exponencial y jitter las fallas al conectar, 429 y 5xx.
+    Los POST no son idempotentes: un timeout de lectura o una conexión cortada
+    después del envío no se reintentan, porque el proveedor pudo haber recibido el
+    mensaje. Una llamada lenta solo ocupa su hilo, no detiene el resto.
+    """
+
+    def __init__(self, sendgrid_api_key=None, sender_email=None, meta_phone_id=None, meta_token=None,
+                 workers=16, email_rate=50.0, whatsapp_rate=20.0, timeout=10.0, max_retries=3,
+                 backoff=0.5, max_backoff=30.0, sendgrid_url=SENDGRID_API_URL, meta_url=META_API_URL):
+        self.sendgrid_api_key = sendgrid_api_key
+        self.sender_email = sender_email
+        self.meta_phone_id = meta_phone_id
+        self.meta_token = meta_token
+        self.workers = workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sendgrid_url = sendgrid_url
+        self.meta_url = meta_url.rstrip('/')
+        self.channels = {
+            'email': Channel('email', email_rate, workers),
+            'whatsapp': Channel('whatsapp', whatsapp_rate, workers),
+        }
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            sendgrid_api_key=os.getenv('SENDGRID_API_KEY'),
+            sender_email=os.getenv('SENDER_EMAIL'),
+            meta_phone_id=os.getenv('META_PHONE_ID'),
+            meta_token=os.getenv('META_TOKEN'),
+            workers=int(os.getenv('REMINDER_WORKERS', '16')),
+            email_rate=float(os.getenv('SENDGRID_RATE_PER_SECOND', '50')),
+            whatsapp_rate=float(os.getenv('META_RATE_PER_SECOND', '20')),
+            timeout=float(os.getenv('REMINDER_TIMEOUT', '10')),
+            max_retries=int(os.getenv('REMINDER_MAX_RETRIES', '3')),
+        )
+
+    # --- Mensajes ---
+    @staticmethod
+    def email_payload(cita, sender_email):
+        return {
+            "personalizations": [{"to": [{"email": cita['USU_MAIL']}]}],
+            "from": {"email": sender_email},
+            "subject": "Recordatorio de cita municipal",
+            "content": [{"type": "text/plain", "value": (
+                f"Estimado {cita['USU_NAME']},\n\n"
+                f"Recordatorio: Su cita está programada para mañana {cita['fecha']} "
+                f"en el horario {cita['hora']} con el funcionario {cita['FUNC']}.\n\n"
+                f"Código de cita: {cita['ID']}\n"
+                f"Funcionario: {cita['FUNC']} ({cita['COD_FUNC']})\n"
+            )}],
+        }
+
+    @staticmethod
+    def whatsapp_payload(cita):
+        return {
+            "messaging_product": "whatsapp",
+            "to": cita['USU_WHATSAPP'].replace('+', ''),
+            "type": "text",
+            "text": {"body": f"Recordatorio: Su cita es mañana {cita['fecha']} a las {cita['hora']} con {cita['FUNC']}."},
+        }
+
+    # --- Envío ---
+    @staticmethod
+    def _not_sent(error):
+        """True si la conexión falló antes de enviar la solicitud (rechazada, DNS o timeout de conexión)."""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def _post(self, channel, url, payload, headers):
+        """POST con límite de tasa y reintentos con backoff exponencial ("full jitter")."""
+        canal = self.channels[channel]
+        for attempt in range(self.max_retries + 1):
+            canal.limiter.acquire()
+            retry_after = None
+            try:
+                response = canal.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+            except requests.ConnectionError as e:
+                # requests.ReadTimeout no es ConnectionError: se propaga sin reintentar
+                if not self._not_sent(e) or attempt == self.max_retries:
+                    raise
+                error = e
+            else:
+                transient = response.status_code == 429 or response.status_code >= 500
+                if not transient or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                error = f"HTTP {response.status_code}"
+            REMINDER_RETRIES.labels(channel).inc()
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            logger.warning(f"Reintento {attempt + 1} de {channel} en {delay:.2f}s: {error}")
+            time.sleep(delay)
+
+    def send_email(self, cita):
+        if not self.sendgrid_api_key or not self.sender_email:
+            raise RuntimeError("Faltan variables de entorno SENDGRID_API_KEY o SENDER_EMAIL")
+        headers = {"Authorization": f"Bearer {self.sendgrid_api_key}", "Content-Type": "application/json"}
+        self._post('email', self.sendgrid_url, self.email_payload(cita, self.sender_email), headers)
+
+    def send_whatsapp(self, cita):
+        if not self.meta_phone_id or not self.meta_token:
+            raise RuntimeError("Faltan variables de entorno META_PHONE_ID o META_TOKEN")
+        url = f"{self.meta_url}/{self.meta_phone_id}/messages"
+        headers = {"Authorization": f"Bearer {self.meta_token}", "Content-Type": "application/json"}
+        self._post('whatsapp', url, self.whatsapp_payload(cita), headers)
+
+    def _send(self, channel, cita, on_sent=None):
+        sender = self.send_email if channel == 'email' else self.send_whatsapp
+        start = time.perf_counter()
+        try:
+            sender(cita)
+            result = 'ok'
+            if on_sent:
+                on_sent(cita, channel)
+        except Exception as e:
+            result = 'error'
+            destino = cita['USU_MAIL'] if channel == 'email' else cita['USU_WHATSAPP']
+            logger.error(f"Error al enviar {channel} a {destino} (cita {cita['ID']}): {e}")
+        REMINDER_SEND_SECONDS.labels(channel).observe(time.perf_counter() - start)
+        REMINDER_MESSAGES.labels(channel, result).inc()
+        return channel, result
+
+    def empty_summary(self):
+        return {name: {'ok': 0, 'error': 0} for name in self.channels}
+
+    def dispatch(self, citas, sent=(), on_sent=None):
+        """Envía correo (y WhatsApp si hay número) a cada cita. Devuelve {canal: {'ok': n, 'error': m}}.
+
+        Omite los pares (ID, canal) de ``sent`` y llama a ``on_sent(cita, canal)``
+        después de cada envío exitoso, para registrarlo.
+        """
+        summary = self.empty_summary()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='reminder') as pool:
+            futures = []
+            for cita in citas:
+                if (cita['ID'], 'email') not in sent:
+                    futures.append(pool.submit(self._send, 'email', cita, on_sent))
+                if cita.get('USU_WHATSAPP') and (cita['ID'], 'whatsapp') not in sent:
+                    futures.append(pool.submit(self._send, 'whatsapp', cita, on_sent))
+            for future in futures:
+                channel, result = future.result()
+                summary[channel][result] += 1
+        return summary
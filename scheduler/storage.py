@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Campos de una cita, en el mismo orden que data/appointments.json
+FIELDS = ["ID", "FUNC", "COD_FUNC", "MOTIV", "USU_NAME", "USU_MAIL",
+          "USU_WHATSAPP", "AVLB", "USU_CONF", "fecha", "hora"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS citas (
+    ID TEXT PRIMARY KEY,
+    FUNC TEXT NOT NULL,
+    COD_FUNC TEXT NOT NULL,
+    MOTIV TEXT NOT NULL DEFAULT '',
+    USU_NAME TEXT NOT NULL DEFAULT '',
+    USU_MAIL TEXT NOT NULL DEFAULT '',
+    USU_WHATSAPP TEXT NOT NULL DEFAULT '',
+    AVLB INTEGER NOT NULL,
+    USU_CONF INTEGER NOT NULL DEFAULT 0,
+    fecha TEXT NOT NULL,
+    hora TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_citas_fecha ON citas (fecha, AVLB, USU_CONF);
+CREATE INDEX IF NOT EXISTS idx_citas_disponibles ON citas (AVLB, fecha, hora, COD_FUNC);
+CREATE INDEX IF NOT EXISTS idx_citas_funcionario ON citas (COD_FUNC, AVLB, fecha, hora);
+CREATE INDEX IF NOT EXISTS idx_citas_confirmacion ON citas (USU_CONF, AVLB);
+-- Días ya pasados, fuera de la tabla activa (ver archive_before)
+CREATE TABLE IF NOT EXISTS citas_historial AS SELECT * FROM citas WHERE 0;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_historial_id ON citas_historial (ID);
+CREATE INDEX IF NOT EXISTS idx_historial_fecha ON citas_historial (fecha);
+-- Recordatorios ya enviados por cita y canal: una nueva ejecución del job no los repite
+CREATE TABLE IF NOT EXISTS recordatorios (
+    ID TEXT NOT NULL,
+    canal TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    PRIMARY KEY (ID, canal)
+);
+CREATE INDEX IF NOT EXISTS idx_recordatorios_fecha ON recordatorios (fecha);
+"""
+
+
+class AppointmentStore:
+    """Citas del scheduler en SQLite (modo WAL).
+
+    ``ID`` es la clave primaria y hay índices por fecha, disponibilidad (AVLB),
+    funcionario y confirmación (USU_CONF), de modo que reservar, confirmar y
+    consultar disponibilidad leen y escriben solo las filas involucradas. Cada
+    cambio es un ``UPDATE ... WHERE AVLB = <esperado>`` dentro de una transacción
+    inmediata: es seguro con el servidor multihilo de Flask y con varios workers
+    de gunicorn sobre el mismo archivo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def init(self, json_path=None):
+        """Crea el esquema y, si la base está vacía, importa las citas de ``json_path``."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+        if json_path and os.path.exists(json_path) and self.count() == 0:
+            self.import_json(json_path)
+        return self
+
+    def import_json(self, json_path):
+        """Carga (o actualiza por ID) las citas de un archivo appointments.json. Devuelve cuántas leyó."""
+        with open(json_path, 'r') as f:
+            citas = json.load(f)['citas']
+        rows = [tuple(cita.get(field, '') for field in FIELDS) for cita in citas]
+        with self._transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO citas ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                rows,
+            )
+        return len(rows)
+
+    def export_json(self, json_path):
+        """Escribe todas las citas con el formato de appointments.json (respaldo o vuelta atrás)."""
+        rows = self._connection().execute(f"SELECT {', '.join(FIELDS)} FROM citas ORDER BY ID").fetchall()
+        tmp_path = json_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({"citas": [dict(row) for row in rows]}, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, json_path)
+        return len(rows)
+
+    # --- Consultas ---
+    def _select(self, where, params, suffix=''):
+        rows = self._connection().execute(
+            f"SELECT {', '.join(FIELDS)} FROM citas WHERE {where} {suffix}", params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, id):
+        rows = self._select("ID = ?", (id,))
+        return rows[0] if rows else None
+
+    def count(self, **filters):
+        where = ' AND '.join(f"{field} = ?" for field in filters) or '1'
+        return self._connection().execute(f"SELECT COUNT(*) FROM citas WHERE {where}", tuple(filters.values())).fetchone()[0]
+
+    def by_date(self, fecha, **filters):
+        """Citas de una fecha (por ejemplo ``AVLB=0, USU_CONF=1``), ordenadas por hora."""
+        where = ' AND '.join(["fecha = ?"] + [f"{field} = ?" for field in filters])
+        return self._select(where, (fecha, *filters.values()), "ORDER BY hora, COD_FUNC")
+
+    def reminders_for(self, fecha):
+        """Citas ocupadas y confirmadas de un día (las que reciben recordatorio); lee solo las filas de ese día."""
+        return self._select("fecha = ? AND AVLB = 0 AND USU_CONF = 1", (fecha,), "ORDER BY hora, COD_FUNC")
+
+    def reminded(self, fecha):
+        """Pares (ID, canal) de los recordatorios ya enviados para las citas de ``fecha``."""
+        rows = self._connection().execute("SELECT ID, canal FROM recordatorios WHERE fecha = ?", (fecha,)).fetchall()
+        return {(row['ID'], row['canal']) for row in rows}
+
+    def mark_reminded(self, id, channel, fecha):
+        """Registra el recordatorio enviado por ``channel`` para la cita ``id``."""
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO recordatorios (ID, canal, fecha) VALUES (?, ?, ?)", (id, channel, fecha))
+
+    def agenda(self, fecha):
+        """Agenda de un día: citas ocupadas (AVLB = 0), ordenadas por hora. Incluye días archivados."""
+        oldest = self.oldest_date()
+        table = 'citas' if oldest and fecha >= oldest else 'citas_historial'
+        rows = self._connection().execute(
+            f"SELECT {', '.join(FIELDS)} FROM {table} WHERE fecha = ? AND AVLB = 0 ORDER BY hora, COD_FUNC", (fecha,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def oldest_date(self):
+        row = self._connection().execute("SELECT MIN(fecha) FROM citas").fetchone()
+        return row[0] or ''
+
+    def next_free(self, n=10, fecha=None, hora=None):
+        """Las próximas ``n`` citas libres desde (fecha, hora), en orden cronológico."""
+        return self._select("AVLB = 1 AND (fecha, hora) >= (?, ?)", (fecha or '', hora or ''),
+                            f"ORDER BY fecha, hora, COD_FUNC LIMIT {int(n)}")
+
+    def free_on(self, fecha):
+        return self.by_date(fecha, AVLB=1)
+
+    def free_for(self, cod_func, fecha=None, limit=None):
+        """Citas libres de un funcionario desde ``fecha`` (opcional), hasta ``limit`` resultados."""
+        suffix = "ORDER BY fecha, hora" + (f" LIMIT {int(limit)}" if limit else '')
+        return self._select("COD_FUNC = ? AND AVLB = 1 AND fecha >= ?", (cod_func, fecha or ''), suffix)
+
+    # --- Actualizaciones atómicas ---
+    def book(self, fecha, hora, usuario, cod_func=None):
+        """Reserva la primera cita libre del bloque (AVLB 1 -> 0). Devuelve la cita o None si no hay."""
+        where = "fecha = ? AND hora = ? AND AVLB = 1"
+        params = [fecha, hora]
+        if cod_func:
+            where += " AND COD_FUNC = ?"
+            params.append(cod_func)
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT ID FROM citas WHERE {where} ORDER BY COD_FUNC LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE citas SET MOTIV = ?, USU_NAME = ?, USU_MAIL = ?, USU_WHATSAPP = ?, AVLB = 0 "
+                "WHERE ID = ? AND AVLB = 1",
+                (usuario['MOTIV'], usuario['USU_NAME'], usuario['USU_MAIL'], usuario['USU_WHATSAPP'], row['ID']),
+            )
+        return self.get(row['ID'])
+
+    def confirm(self, id):
+        """Marca USU_CONF = 1 en una cita ocupada. Devuelve False si no existe o está libre."""
+        with self._transaction() as conn:
+            cursor = conn.execute("UPDATE citas SET USU_CONF = 1 WHERE ID = ? AND AVLB = 0", (id,))
+        return cursor.rowcount == 1
+
+    # --- Archivo ---
+    def archive_before(self, fecha):
+        """Mueve a ``citas_historial`` las citas anteriores a ``fecha``. Devuelve cuántas movió.
+
+        Mantiene la tabla activa (y sus índices) del tamaño del calendario vigente,
+        aunque el historial siga creciendo.
+        """
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO citas_historial SELECT * FROM citas WHERE fecha < ?", (fecha,))
+            cursor = conn.execute("DELETE FROM citas WHERE fecha < ?", (fecha,))
+            conn.execute("DELETE FROM recordatorios WHERE fecha < ?", (fecha,))
+        return cursor.rowcount
+
+
+if __name__ == "__main__":
+    # Migración desde el archivo JSON: python storage.py data/appointments.json data/appointments.db
+    parser = argparse.ArgumentParser(description="Migra data/appointments.json a la base SQLite del scheduler")
+    parser.add_argument('json_path', nargs='?', default='data/appointments.json')
+    parser.add_argument('db_path', nargs='?', default=os.getenv('APPOINTMENTS_DB', 'data/appointments.db'))
+    parser.add_argument('--export', action='store_true', help="Exportar la base a json_path en lugar de importar")
+    parser.add_argument('--archive-before', metavar='YYYY-MM-DD', help="Archivar las citas anteriores a esa fecha")
+    args = parser.parse_args()
+
+    store = AppointmentStore(args.db_path).init()
+    if args.archive_before:
+        print(f"{store.archive_before(args.archive_before)} citas archivadas (anteriores a {args.archive_before})")
+    elif args.export:
+        print(f"{store.export_json(args.json_path)} citas exportadas a {args.json_path}")
+    else:
+        print(f"{store.import_json(args.json_path)} citas migradas a {args.db_path} ({store.count()} en total)")
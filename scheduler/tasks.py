@@ -1,82 +1,59 @@
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-import json
+import fcntl
 import os
 import pytz
-import requests # Importar requests
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from storage import AppointmentStore
+from reminders import ReminderDispatcher
 
-# Configuración de WhatsApp (Meta Cloud API)
-META_PHONE_ID = os.getenv('META_PHONE_ID')
-META_TOKEN = os.getenv('META_TOKEN')
+# Base de citas compartida con app.py (ver storage.py)
+STORE = AppointmentStore(os.getenv('APPOINTMENTS_DB', 'data/appointments.db'))
 
-def send_reminder():
-    """Enviar recordatorios un día antes de la cita"""
-    # Leer citas desde el archivo JSON
-    with open('data/appointments.json', 'r') as f:
-        citas = json.load(f)['citas']
-    
-    # Obtener fecha de mañana en Santiago de Chile
-    tomorrow = datetime.now(pytz.timezone('America/Santiago')) + timedelta(days=1)
-    tomorrow_str = tomorrow.strftime("%Y-%m-%d")
-    
-    for cita in citas:
-        if (cita['fecha'] == tomorrow_str and 
-            cita['AVLB'] == 0 and  # Ocupado
-            cita['USU_CONF'] == 1):  # Confirmado
-        
-            # Enviar correo
-            send_email(cita)
-            
-            # Enviar WhatsApp (si hay número)
-            if cita.get('USU_WHATSAPP'):
-                send_whatsapp(cita)
+# Envío concurrente de correos (SendGrid) y WhatsApp (Meta Cloud API), ver reminders.py
+DISPATCHER = ReminderDispatcher.from_env()
 
-def send_email(cita):
-    """Enviar correo de recordatorio usando SendGrid"""
-    message = Mail(
-        from_email=os.getenv('SENDER_EMAIL'),
-        to_emails=cita['USU_MAIL'],
-        subject='Recordatorio de cita municipal',
-        plain_text_content=f"""
-        Estimado {cita['USU_NAME']},
+@contextmanager
+def single_worker(lock_path):
+    """Flock no bloqueante sobre ``lock_path``: True en el proceso que lo obtiene, False en los demás."""
+    with open(lock_path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
 
-        Recordatorio: Su cita está programada para mañana {cita['fecha']} 
-        en el horario {cita['hora']} con el funcionario {cita['FUNC']}.
+def send_reminder():
+    """Enviar recordatorios un día antes de la cita. Devuelve el resumen por canal."""
+    # Cada worker de gunicorn programa el job: solo envía el que obtiene el flock, y los
+    # recordatorios ya registrados en la base no se repiten si el job vuelve a correr
+    with single_worker(os.getenv('REMINDER_LOCK', STORE.path + '.reminder.lock')) as acquired:
+        if not acquired:
+            return DISPATCHER.empty_summary()
+        # Obtener fecha de mañana en Santiago de Chile
+        tomorrow = datetime.now(pytz.timezone('America/Santiago')) + timedelta(days=1)
+        tomorrow_str = tomorrow.strftime("%Y-%m-%d")
 
-        Código de cita: {cita['ID']}
-        Funcionario: {cita['FUNC']} ({cita['COD_FUNC']})
-        """
-    )
-    try:
-        sg = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        sg.send(message)
-    except Exception as e:
-        print(f"Error al enviar correo a {cita['USU_MAIL']}: {str(e)}")
+        # Citas de mañana ocupadas (AVLB = 0) y confirmadas (USU_CONF = 1), leídas por el índice de fecha
+        citas = STORE.reminders_for(tomorrow_str)
+        summary = DISPATCHER.dispatch(
+            citas,
+            sent=STORE.reminded(tomorrow_str),
+            on_sent=lambda cita, channel: STORE.mark_reminded(cita['ID'], channel, cita['fecha']),
+        )
+        print(f"Recordatorios del {tomorrow_str}: {len(citas)} citas, {summary}")
+        return summary
 
-def send_whatsapp(cita):
-    """Enviar mensaje de WhatsApp usando Meta Cloud API"""
-    if not META_PHONE_ID or not META_TOKEN:
-        print("Error: Faltan variables de entorno META_PHONE_ID o META_TOKEN")
-        return
-    try:
-        phone_number = cita['USU_WHATSAPP'].replace('+', '')
-        url = f"https://graph.facebook.com/v19.0/{META_PHONE_ID}/messages"
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": phone_number,
-            "type": "text",
-            "text": { "body": f"Recordatorio: Su cita es mañana {cita['fecha']} a las {cita['hora']} con {cita['FUNC']}." }
-        }
-        headers = {
-            "Authorization": f"Bearer {META_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        response = requests.post(url, json=payload, headers=headers)
-    except Exception as e:
-        print(f"Error al enviar WhatsApp a {cita['USU_WHATSAPP']}: {str(e)}")
+def archive_past_appointments():
+    """Archivar las citas con más de ARCHIVE_AFTER_DAYS días, para que la tabla activa no crezca con el historial"""
+    # Cada worker de gunicorn programa el job: solo lo ejecuta el que obtiene el flock
+    # (si otro lo repite después, no encuentra citas que archivar)
+    with single_worker(os.getenv('ARCHIVE_LOCK', STORE.path + '.archive.lock')) as acquired:
+        if not acquired:
+            return
+        days = int(os.getenv('ARCHIVE_AFTER_DAYS', '30'))
+        limit = (datetime.now(pytz.timezone('America/Santiago')) - timedelta(days=days)).strftime("%Y-%m-%d")
+        print(f"{STORE.archive_before(limit)} citas archivadas (anteriores a {limit})")
 
 def setup_scheduler():
     """Configurar el scheduler de APScheduler"""
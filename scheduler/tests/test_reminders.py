@@ -0,0 +1,125 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from reminders import ReminderDispatcher
+
+
+class StubProvider:
+    """Proveedor local: responde con los (status, headers, demora) programados, en orden, y registra cada POST."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.requests.append((self.path, body))
+                status, headers, delay = stub.script.pop(0) if stub.script else (202, {}, 0)
+                time.sleep(delay)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stub():
+    provider = StubProvider()
+    yield provider
+    provider.server.shutdown()
+
+
+def _dispatcher(url, **kwargs):
+    kwargs.setdefault('backoff', 0.01)
+    kwargs.setdefault('workers', 4)
+    return ReminderDispatcher(sendgrid_api_key='key', sender_email='municipio@example.com', meta_phone_id='123',
+                              meta_token='token', email_rate=0, whatsapp_rate=0, timeout=1.0,
+                              sendgrid_url=f"{url}/mail", meta_url=url, **kwargs)
+
+
+def _cita(id, whatsapp=''):
+    return {"ID": id, "FUNC": "Ana", "COD_FUNC": "F1", "USU_NAME": "Juan", "USU_MAIL": f"{id}@example.com",
+            "USU_WHATSAPP": whatsapp, "fecha": "2025-01-10", "hora": "10:00"}
+
+
+def test_retries_server_errors_with_backoff(stub):
+    stub.script = [(503, {}, 0), (500, {}, 0)]
+    assert _dispatcher(stub.url).dispatch([_cita('C1')]) == {'email': {'ok': 1, 'error': 0}, 'whatsapp': {'ok': 0, 'error': 0}}
+    assert len(stub.requests) == 3
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.script = [(503, {}, 0)] * 3
+    summary = _dispatcher(stub.url, max_retries=2).dispatch([_cita('C1')])
+    assert summary['email'] == {'ok': 0, 'error': 1}
+    assert len(stub.requests) == 3
+
+
+def test_honours_retry_after_on_429(stub):
+    stub.script = [(429, {'Retry-After': '1'}, 0)]
+    start = time.monotonic()
+    summary = _dispatcher(stub.url).dispatch([_cita('C1')])
+    assert summary['email'] == {'ok': 1, 'error': 0}
+    assert time.monotonic() - start >= 1
+    assert len(stub.requests) == 2
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.script = [(400, {}, 0)]
+    assert _dispatcher(stub.url).dispatch([_cita('C1')])['email'] == {'ok': 0, 'error': 1}
+    assert len(stub.requests) == 1
+
+
+def test_read_timeout_is_not_retried(stub):
+    # El proveedor pudo haber recibido el POST: reintentarlo duplicaría el mensaje
+    stub.script = [(202, {}, 1.5)]
+    dispatcher = _dispatcher(stub.url)
+    with pytest.raises(requests.ReadTimeout):
+        dispatcher.send_email(_cita('C1'))
+    assert len(stub.requests) == 1
+
+
+def test_connection_refused_is_retried():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        url = f"http://127.0.0.1:{s.getsockname()[1]}"
+    dispatcher = _dispatcher(url, max_retries=2)
+    attempts = []
+    original = dispatcher.channels['email'].session.post
+    dispatcher.channels['email'].session.post = lambda *a, **kw: attempts.append(1) or original(*a, **kw)
+    with pytest.raises(requests.ConnectionError):
+        dispatcher.send_email(_cita('C1'))
+    assert len(attempts) == 3
+
+
+def test_summary_per_channel_skips_sent_and_reports_each_success(stub):
+    # Solo la cita C2 tiene WhatsApp; el correo de C3 ya se había enviado en una ejecución anterior
+    citas = [_cita('C1'), _cita('C2', whatsapp='+56911111111'), _cita('C3')]
+    stub.script = [(400, {}, 0)]  # primer envío (correo de C1, con un solo hilo) rechazado
+    sent = []
+    dispatcher = _dispatcher(stub.url, workers=1)
+    summary = dispatcher.dispatch(citas, sent={('C3', 'email')}, on_sent=lambda cita, channel: sent.append((cita['ID'], channel)))
+    assert summary == {'email': {'ok': 1, 'error': 1}, 'whatsapp': {'ok': 1, 'error': 0}}
+    assert sorted(sent) == [('C2', 'email'), ('C2', 'whatsapp')]
+    assert [path for path, _ in stub.requests] == ['/mail', '/mail', '/123/messages']
+    assert stub.requests[2][1]['to'] == '56911111111'